@@ -11,21 +11,105 @@ import sys
 import numpy as np
 import re
 import threading
+import queue
+from collections import deque
 import sqlite3
+import shutil
+import json
+import zlib
+from array import array
+from bisect import bisect_left
 from datetime import datetime
 import api # Assuming api.py holds your keys correctly
 
-# --- Message History (Optional, for context) ---
-message_history = []
+# --- Conversation Context ---
+# Chat requests send a bounded window of recent turns instead of the whole history.
+# Turns that fall out of the window (or don't fit the token budget) are queued and
+# folded into a short running summary by a background Gemini call once enough pile up,
+# so prompt size stays flat however long the conversation runs.
+CONTEXT_MAX_TURNS = 12
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_SUMMARY_TRIGGER_TOKENS = 300
+CONTEXT_SUMMARY_MAX_WORDS = 80
+CHAT_SENDERS_AS_MODEL = {'computer'} # Everything else (user_voice, user_web_chat) is the user
+
+def estimate_tokens(text):
+    """Rough token count (~4 chars per token); avoids a count_tokens API round trip."""
+    return len(text) // 4 + 1
+
+class ConversationContext:
+    """Bounded deque of chat turns plus a lazily updated summary of older ones."""
+    def __init__(self, max_turns=CONTEXT_MAX_TURNS, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.turns = deque(maxlen=max_turns) # dicts: sender, text
+        self.token_budget = token_budget
+        self.summary = ""
+        self.pending = [] # Turns dropped from the window, not yet summarized
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    def add(self, sender, text):
+        with self._lock:
+            if len(self.turns) == self.turns.maxlen: self.pending.append(self.turns[0])
+            self.turns.append({'sender': sender, 'text': text})
+
+    def history_text(self):
+        with self._lock:
+            return "\n".join(f"{m['sender']}: {m['text']}" for m in self.turns)
+
+    def build_contents(self):
+        """
+        Gemini `contents` for the next reply: summary (if any) + as many recent turns as fit
+        the token budget, merged so roles alternate. The last turn should be the user's message.
+        """
+        with self._lock:
+            used = estimate_tokens(self.summary) if self.summary else 0
+            while len(self.turns) > 1 and used + sum(estimate_tokens(m['text']) for m in self.turns) > self.token_budget:
+                self.pending.append(self.turns.popleft())
+            contents = []
+            if self.summary:
+                contents.append({'role': 'user', 'parts': [f"(Summary of our earlier conversation: {self.summary})"]})
+                contents.append({'role': 'model', 'parts': ["Got it."]})
+            for m in self.turns:
+                role = 'model' if m['sender'] in CHAT_SENDERS_AS_MODEL else 'user'
+                if contents and contents[-1]['role'] == role: contents[-1]['parts'][0] += "\n" + m['text']
+                else: contents.append({'role': role, 'parts': [m['text']]})
+            if contents and contents[0]['role'] == 'model': contents.insert(0, {'role': 'user', 'parts': ["(conversation continues)"]})
+            start_summary = not self._summarizing and sum(estimate_tokens(m['text']) for m in self.pending) >= CONTEXT_SUMMARY_TRIGGER_TOKENS
+            if start_summary: self._summarizing = True
+        if start_summary: threading.Thread(target=self._summarize_pending, daemon=True).start()
+        return contents
+
+    def _summarize_pending(self):
+        """Folds pending turns into the summary off the request path."""
+        with self._lock: batch = list(self.pending); previous = self.summary
+        transcript = "\n".join(f"{m['sender']}: {m['text']}" for m in batch)
+        summary = None
+        if gemini_summary_model:
+            prompt = (f"Update this running summary of a chat between a user and their speaking coach 'Buddy'. "
+                      f"Keep names, goals and advice given; at most {CONTEXT_SUMMARY_MAX_WORDS} words.\n\n"
+                      f"Current summary: {previous or '(none)'}\n\nNew turns:\n{transcript}")
+            try: summary = extract_response_text(gemini_summary_model.generate_content(prompt))
+            except Exception as e: print(f"   ⚠️ Conversation summary failed: {e}")
+        if not summary: # Fallback: keep the tail of the raw text
+            words = f"{previous} {transcript}".split()
+            summary = " ".join(words[-CONTEXT_SUMMARY_MAX_WORDS:])
+        with self._lock:
+            self.summary = summary; del self.pending[:len(batch)]; self._summarizing = False
+
+conversation = ConversationContext()
 
 def add_message(sender, text):
-    global message_history
-    message_history.append({'sender': sender, 'text': text})
-    if len(message_history) > 10:
-        message_history.pop(0)
+    conversation.add(sender, text)
 
 def get_message_history_text():
-    return "\n".join([f"{m['sender']}: {m['text']}" for m in message_history])
+    return conversation.history_text()
+
+def extract_response_text(response):
+    """Text from a Gemini response ('' if there isn't any)."""
+    if hasattr(response, 'parts') and response.parts: return "".join(part.text for part in response.parts if hasattr(part, 'text')).strip()
+    if hasattr(response, 'text'): return (response.text or "").strip()
+    if isinstance(response, str): return response.strip()
+    return ""
 
 # --- Configuration ---
 GOOGLE_API_KEY_FROM_USER = api.GOOGLE_API_KEY_FROM_USER
@@ -39,17 +123,125 @@ ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", ELEVENLABS_API_KEY_FROM_USE
 VOICE_NAME = "Elli"
 
 # --- Constants ---
+BUDDY_INSTRUCTION = "You are a funny, supportive AI study buddy named 'Buddy'. Keep responses concise and friendly. You are interacting via direct voice. You want to help making our speaking skills better."
+SPEECH_REVIEW_INSTRUCTION = ("You are Buddy, a friendly public speaking coach. You get a practice transcript with its "
+                             "words per minute, filler word count and final posture. Give 2-3 short, specific, encouraging "
+                             "tips in plain spoken sentences (no lists or markdown), since the reply is read aloud.")
+
 START_PRACTICE_PHRASE = "start practice speech"
 END_PRACTICE_PHRASE = "end speech"
 STOP_COMMAND = "stop"
 FILLER_WORDS = ["um", "uh", "ah", "er", "like", "so", "you know", "actually", "basically", "well", "right"]
 DB_FILE = "study_buddy_sessions.db"
 
+ROLLING_WPM_WINDOW_SECONDS = 30.0
+PAUSE_THRESHOLD_SECONDS = 2.0
+PACE_BUCKET_SECONDS = 60.0
+
+# One combined pattern (longest fillers first) so each phrase is scanned once
+FILLER_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(f) for f in sorted(FILLER_WORDS, key=len, reverse=True)) + r')\b')
+
+# --- Transcript Segment Store ---
+class TranscriptSegments:
+    """
+    Append-only store of recognized phrases for one practice session.
+    Keeps per-segment word counts, start/end times (seconds since session start)
+    and filler hits in flat arrays, so appends are O(1) and window queries use bisect.
+    """
+    def __init__(self, start_time=None):
+        self.start_time = start_time
+        self.texts = []
+        self.starts = array('d'); self.ends = array('d')
+        self.word_counts = array('I'); self.filler_counts = array('I')
+        self.cum_words = array('Q', [0]) # cum_words[i] = words in segments [0, i)
+        self.total_words = 0; self.total_fillers = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def append(self, text, start, end):
+        """Adds one recognized phrase. start/end are absolute time.time() values."""
+        text = text.strip()
+        if not text: return
+        origin = self.start_time if self.start_time is not None else start
+        rel_start = max(0.0, start - origin); rel_end = max(rel_start, end - origin)
+        words = len(text.split()); fillers = len(FILLER_PATTERN.findall(text.lower()))
+        with self._lock:
+            if self.ends and rel_end < self.ends[-1]: rel_end = self.ends[-1] # keep ends monotonic for bisect
+            self.texts.append(text); self.starts.append(rel_start); self.ends.append(rel_end)
+            self.word_counts.append(words); self.filler_counts.append(fillers)
+            self.total_words += words; self.total_fillers += fillers
+            self.cum_words.append(self.total_words)
+
+    def text(self):
+        """Full transcript, joined on demand."""
+        with self._lock:
+            return " ".join(self.texts)
+
+    def elapsed(self, now=None):
+        if self.start_time is None: return 0.0
+        return max(0.0, (now if now is not None else time.time()) - self.start_time)
+
+    def rolling_wpm(self, now=None, window=ROLLING_WPM_WINDOW_SECONDS):
+        """WPM over the last `window` seconds; a phrase crossing the window edge counts pro rata."""
+        elapsed = self.elapsed(now)
+        span = min(window, elapsed)
+        if span <= 1: return 0
+        cutoff = elapsed - window
+        with self._lock:
+            first = bisect_left(self.ends, cutoff)
+            words = self.cum_words[-1] - self.cum_words[first]
+            i = first
+            while i < len(self.starts) and self.starts[i] < cutoff: # Drop the share spoken before the window
+                duration = self.ends[i] - self.starts[i]
+                if duration > 0: words -= self.word_counts[i] * (cutoff - self.starts[i]) / duration
+                i += 1
+        return int(words / (span / 60.0))
+
+    def pauses(self, min_gap=PAUSE_THRESHOLD_SECONDS):
+        """Silent gaps between consecutive segments as [start, end] pairs (seconds)."""
+        with self._lock:
+            return [[round(self.ends[i - 1], 2), round(self.starts[i], 2)]
+                    for i in range(1, len(self.starts)) if self.starts[i] - self.ends[i - 1] >= min_gap]
+
+    def pace_series(self, bucket=PACE_BUCKET_SECONDS, now=None):
+        """Words per minute for each `bucket`-second slice of the session, by segment midpoint."""
+        with self._lock:
+            duration = max(self.ends[-1] if self.ends else 0.0, self.elapsed(now) if now is not None else 0.0)
+            if duration <= 0: return []
+            n_buckets = int(duration // bucket) + 1; words = [0] * n_buckets
+            for s, e, w in zip(self.starts, self.ends, self.word_counts):
+                words[min(int(((s + e) / 2.0) // bucket), n_buckets - 1)] += w
+        # The last bucket is usually partial, scale by its real length
+        last_len = duration - (n_buckets - 1) * bucket
+        series = [int(w * 60.0 / bucket) for w in words[:-1]]
+        series.append(int(words[-1] * 60.0 / last_len) if last_len > 1 else 0)
+        return series
+
+    def to_dict(self):
+        with self._lock:
+            return {'texts': list(self.texts), 'starts': [round(v, 2) for v in self.starts],
+                    'ends': [round(v, 2) for v in self.ends], 'words': list(self.word_counts),
+                    'fillers': list(self.filler_counts)}
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls(start_time=0.0)
+        for text, start, end in zip(data.get('texts', []), data.get('starts', []), data.get('ends', [])):
+            store.append(text, start, end)
+        return store
+
+def new_practice_data(start_time=None):
+    """Fresh per-session practice state."""
+    return {"segments": TranscriptSegments(start_time), "start_time": start_time}
+
 # --- Shared State & Locks ---
 is_practicing_speech = False
 current_posture_status = "Posture: Initializing..."
 posture_lock = threading.Lock()
-speech_practice_data = {"text": "", "start_time": None}
+speech_practice_data = new_practice_data()
 main_thread_should_stop = False
 
 latest_frame = None
@@ -57,49 +249,159 @@ frame_lock = threading.Lock()
 last_ai_message = "AI Initializing..." # For web UI display if needed
 ai_message_lock = threading.Lock()
 
+# Bumped by every write path so readers can tell whether cached data is still current
+data_versions = {"sessions": 0, "notecards": 0, "ai_message": 0}
+data_version_lock = threading.Lock()
+
+def bump_data_version(name):
+    with data_version_lock:
+        data_versions[name] += 1
+
+def get_data_versions(*names):
+    with data_version_lock:
+        return tuple(data_versions[name] for name in names)
+
 # --- Database Functions ---
-# (init_database and save_practice_session remain unchanged)
+SESSIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS speech_practice_sessions (
+        session_id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
+        duration_seconds REAL NOT NULL, total_words INTEGER NOT NULL,
+        wpm INTEGER NOT NULL, filler_count INTEGER NOT NULL,
+        final_posture TEXT )
+"""
+SESSION_COLUMNS = "session_id, timestamp, duration_seconds, total_words, wpm, filler_count, final_posture"
+TRANSCRIPT_COMPRESSION_LEVEL = 6
+
+def compress_text(text):
+    """zlib-compresses a string for BLOB storage (None stays None)."""
+    if text is None: return None
+    return zlib.compress(text.encode('utf-8'), TRANSCRIPT_COMPRESSION_LEVEL)
+
+def decompress_text(blob):
+    if blob is None: return None
+    return zlib.decompress(blob).decode('utf-8')
+
+def migrate_inline_transcripts(cursor):
+    """
+    Moves transcript/segments columns from old speech_practice_sessions rows into
+    session_transcripts (compressed) and rebuilds the sessions table without them.
+    Returns True if a migration ran.
+    """
+    session_columns = [row[1] for row in cursor.execute("PRAGMA table_info(speech_practice_sessions)")]
+    if 'transcript' not in session_columns: return False
+    segments_expr = "segments" if 'segments' in session_columns else "NULL"
+    rows = cursor.execute(f"SELECT session_id, transcript, {segments_expr} FROM speech_practice_sessions").fetchall()
+    cursor.executemany("INSERT OR REPLACE INTO session_transcripts (session_id, transcript, segments) VALUES (?, ?, ?)",
+                       [(sid, compress_text(text), compress_text(segments)) for sid, text, segments in rows])
+    cursor.execute("ALTER TABLE speech_practice_sessions RENAME TO speech_practice_sessions_old")
+    cursor.execute(SESSIONS_TABLE_SQL)
+    cursor.execute(f"INSERT INTO speech_practice_sessions ({SESSION_COLUMNS}) SELECT {SESSION_COLUMNS} FROM speech_practice_sessions_old")
+    cursor.execute("DROP TABLE speech_practice_sessions_old")
+    print(f"   Migrated {len(rows)} inline transcript(s) to compressed storage.")
+    return True
+
+def create_trend_indexes(cursor):
+    """Covering index for time-range trend queries, so they never touch the table rows."""
+    cursor.execute("""CREATE INDEX IF NOT EXISTS idx_sessions_trends
+                      ON speech_practice_sessions (timestamp, wpm, filler_count, duration_seconds)""")
+    return False
+
+# Schema migrations, applied in order. PRAGMA user_version records the last one applied.
+# Each takes a cursor and returns True if it freed enough space to be worth a VACUUM.
+# Append new steps at the end; never reorder or remove existing ones.
+MIGRATIONS = [
+    migrate_inline_transcripts, # 1
+    create_trend_indexes,       # 2
+]
+
+def apply_migrations(cursor):
+    """Runs any migrations newer than the DB's user_version. Returns True if a VACUUM is worthwhile."""
+    current = cursor.execute("PRAGMA user_version").fetchone()[0]
+    reclaim = False
+    for version, migration in enumerate(MIGRATIONS[current:], start=current + 1):
+        print(f"   Applying schema migration {version}: {migration.__name__}")
+        reclaim = migration(cursor) or reclaim
+        cursor.execute(f"PRAGMA user_version = {version}")
+    return reclaim
+
 def init_database():
-    """Initializes the SQLite DB and creates tables if they don't exist."""
+    """Initializes the SQLite DB, creates tables if they don't exist and applies schema migrations."""
     try:
         with sqlite3.connect(DB_FILE) as conn:
             cursor = conn.cursor()
+            cursor.execute(SESSIONS_TABLE_SQL)
+            # Transcripts live in a side table so session listings and polls never read them
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS session_transcripts (
+                    session_id INTEGER PRIMARY KEY, -- same id as speech_practice_sessions
+                    transcript BLOB, segments BLOB )
+            """)
             cursor.execute("""
-                CREATE TABLE IF NOT EXISTS speech_practice_sessions (
-                    session_id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,
-                    duration_seconds REAL NOT NULL, total_words INTEGER NOT NULL,
-                    wpm INTEGER NOT NULL, filler_count INTEGER NOT NULL,
-                    final_posture TEXT, transcript TEXT )
+                CREATE TABLE IF NOT EXISTS session_recordings (
+                    session_id INTEGER NOT NULL, segment_index INTEGER NOT NULL, path TEXT NOT NULL,
+                    frames INTEGER NOT NULL, dropped_frames INTEGER NOT NULL, fps REAL NOT NULL,
+                    PRIMARY KEY (session_id, segment_index) )
             """)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS notecards (
                     id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
                     content TEXT NOT NULL, tags TEXT, created_at TEXT NOT NULL )
             """)
+            reclaim = apply_migrations(cursor)
             conn.commit()
+            if reclaim: conn.execute("VACUUM") # Reclaim pages freed by a migration
             print(f"✅ Database '{DB_FILE}' initialized successfully.")
     except sqlite3.Error as e:
         print(f"❌❌ DATABASE ERROR during initialization: {e}")
 
-def save_practice_session(timestamp, duration, words, wpm, fillers, posture, transcript):
-    """Saves the results of a practice session to the database."""
+def load_session_transcript(conn, session_id):
+    """Returns {'transcript', 'segments'} for one session (segments as a dict), or None if missing."""
+    row = conn.execute("SELECT transcript, segments FROM session_transcripts WHERE session_id = ?", (session_id,)).fetchone()
+    if row is None: return None
+    segments_json = decompress_text(row[1])
+    return {'transcript': decompress_text(row[0]) or "", 'segments': json.loads(segments_json) if segments_json else None}
+
+def save_practice_session(timestamp, duration, words, wpm, fillers, posture, transcript, segments=None):
+    """
+    Saves the results of a practice session to the database and returns its session_id (None on error).
+    `segments` is a TranscriptSegments.to_dict().
+    """
     sql = """ INSERT INTO speech_practice_sessions
-              (timestamp, duration_seconds, total_words, wpm, filler_count, final_posture, transcript)
-              VALUES (?, ?, ?, ?, ?, ?, ?) """
-    data_tuple = (timestamp, duration, words, wpm, fillers, posture, transcript)
+              (timestamp, duration_seconds, total_words, wpm, filler_count, final_posture)
+              VALUES (?, ?, ?, ?, ?, ?) """
+    data_tuple = (timestamp, duration, words, wpm, fillers, posture)
+    segments_json = json.dumps(segments, separators=(',', ':')) if segments is not None else None
     try:
         with sqlite3.connect(DB_FILE) as conn:
             cursor = conn.cursor()
             cursor.execute(sql, data_tuple)
-            print(f"✅ Practice session data saved to database (ID: {cursor.lastrowid}).")
+            cursor.execute("INSERT INTO session_transcripts (session_id, transcript, segments) VALUES (?, ?, ?)",
+                           (cursor.lastrowid, compress_text(transcript), compress_text(segments_json)))
+            session_id = cursor.lastrowid
+            print(f"✅ Practice session data saved to database (ID: {session_id}).")
+        bump_data_version("sessions")
+        return session_id
     except sqlite3.Error as e:
         print(f"❌❌ DATABASE ERROR during save: {e}")
+        return None
+
+def save_session_recording(session_id, segments):
+    """Links finished recording segments (dicts from SessionRecorder) to a saved session."""
+    rows = [(session_id, seg['index'], seg['path'], seg['frames'], seg['dropped'], seg['fps']) for seg in segments]
+    try:
+        with sqlite3.connect(DB_FILE) as conn:
+            conn.executemany("""INSERT OR REPLACE INTO session_recordings
+                                (session_id, segment_index, path, frames, dropped_frames, fps) VALUES (?, ?, ?, ?, ?, ?)""", rows)
+    except sqlite3.Error as e:
+        print(f"❌❌ DATABASE ERROR saving recording links: {e}")
 
 
 # --- Setup Clients & Services ---
 # (Initialization logic remains unchanged)
 elevenlabs_client = None
 gemini_model = None
+gemini_review_model = None
+gemini_summary_model = None # No persona, so context summaries stay neutral
 mic = None
 mic_available = False
 pose = None
@@ -122,15 +424,14 @@ else:
     try:
         print(f"   Configuring Gemini with key ending ...{GOOGLE_API_KEY[-4:]}")
         genai.configure(api_key=GOOGLE_API_KEY)
-        gemini_model = genai.GenerativeModel(
-            'gemini-1.5-flash',
-             # System prompt adjusted for direct voice interaction
-            system_instruction="You are a funny, supportive AI study buddy named 'Buddy'. Keep responses concise and friendly. You are interacting via direct voice. You want to help making our speaking skills better."
-        )
+        # Instructions are configured once per model so prompts only carry the conversation/data
+        gemini_model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=BUDDY_INSTRUCTION)
+        gemini_review_model = genai.GenerativeModel('gemini-1.5-flash', system_instruction=SPEECH_REVIEW_INSTRUCTION)
+        gemini_summary_model = genai.GenerativeModel('gemini-1.5-flash')
         print("✅ Google Gemini configured.")
     except Exception as e:
         print(f"❌ Gemini Initialization Error: {e}")
-        gemini_model = None
+        gemini_model = None; gemini_review_model = None; gemini_summary_model = None
 # Speech Recognition Mic Check
 r = sr.Recognizer() # Define recognizer instance globally
 try:
@@ -161,17 +462,18 @@ except Exception as e:
 # --- Helper Functions ---
 
 # **** MODIFIED speak FUNCTION ****
-def speak(text):
+def speak(text, remember=True):
     """
     Updates the global 'last_ai_message' state AND
     Uses ElevenLabs to generate and PLAY audio LOCALLY if available.
+    remember=False keeps the message (e.g. an error) out of the chat context sent to Gemini.
     """
     global last_ai_message, ai_message_lock, elevenlabs_client
 
     if not text or not isinstance(text, str):
         print("   ⚠️ Speak function called with invalid text.")
         with ai_message_lock: last_ai_message = "Internal message error occurred."
-        add_message('computer', last_ai_message)
+        bump_data_version("ai_message")
         return
 
     print(f"AI intends to say: '{text[:100]}...'")
@@ -179,7 +481,8 @@ def speak(text):
     # Update shared state for potential web display via API
     with ai_message_lock:
         last_ai_message = text
-    add_message('computer', text)
+    bump_data_version("ai_message")
+    if remember: add_message('computer', text)
 
     # --- TTS Generation and LOCAL Playback ---
     if not elevenlabs_client:
@@ -221,24 +524,106 @@ def get_last_ai_message():
             print("CRITICAL WARNING: last_ai_message global variable not found!")
             return "AI message state error."
 
-# (analyze_posture function remains unchanged)
-def analyze_posture(landmarks):
-    """Analyzes MediaPipe landmarks for simple posture cues."""
-    if not landmarks: return "Posture: No user detected"
+# --- Posture Engine ---
+# Each frame's five key landmarks become one (5, 4) array of x, y, z, visibility, pushed
+# into a ring buffer. Metrics are computed with NumPy over the whole window, and each
+# posture issue has separate enter/exit thresholds so the label doesn't flicker.
+POSTURE_LANDMARK_IDS = [ mp_pose.PoseLandmark.NOSE.value, mp_pose.PoseLandmark.LEFT_SHOULDER.value,
+    mp_pose.PoseLandmark.RIGHT_SHOULDER.value, mp_pose.PoseLandmark.LEFT_EAR.value, mp_pose.PoseLandmark.RIGHT_EAR.value ]
+NOSE, L_SHOULDER, R_SHOULDER, L_EAR, R_EAR = range(5) # Rows of the per-frame array
+POSTURE_WINDOW_FRAMES = 30
+POSTURE_MIN_VALID_FRAMES = 5
+VISIBILITY_THRESHOLD = 0.4
+# (label, metric, enter when metric is "above"/"below" enter, leave once past exit), in priority order
+POSTURE_RULES = [
+    ("Posture: Possible Slouching", "slouch_ratio", "below", 0.35, 0.42),  # nose height above shoulder line / shoulder width
+    ("Posture: Leaning Forward", "forward_lean", "above", 2.0, 1.7),       # nose depth ahead of shoulders / shoulder width (rough, z is noisy)
+    ("Posture: Head Tilt Detected", "head_tilt", "above", 8.0, 5.0),        # ear line vs horizontal, degrees
+    ("Posture: Uneven Shoulders", "shoulder_angle", "above", 7.0, 4.0),     # shoulder line vs horizontal, degrees
+    ("Posture: Fidgeting", "jitter", "above", 0.035, 0.025),                # median frame-to-frame nose movement / shoulder width
+]
+
+def landmarks_to_array(landmarks, aspect=1.0):
+    """
+    Pulls the posture landmarks into a (5, 4) float32 array in one pass.
+    y is scaled by `aspect` (frame height / width) so x and y share units.
+    """
+    lm = landmarks.landmark
+    points = np.array([(lm[i].x, lm[i].y, lm[i].z, lm[i].visibility) for i in POSTURE_LANDMARK_IDS], dtype=np.float32)
+    points[:, 1] *= aspect
+    return points
+
+class PostureEngine:
+    """Sliding window of landmark frames with vectorized metrics and hysteresis labels."""
+    def __init__(self, window=POSTURE_WINDOW_FRAMES):
+        self.frames = np.zeros((window, len(POSTURE_LANDMARK_IDS), 4), dtype=np.float32)
+        self.count = 0; self.pos = 0
+        self.active = {rule[0]: False for rule in POSTURE_RULES}
+        self.metrics = {}
+
+    def reset(self):
+        self.count = 0; self.pos = 0
+        self.active = {label: False for label in self.active}; self.metrics = {}
+
+    def push(self, points):
+        self.frames[self.pos] = points
+        self.pos = (self.pos + 1) % len(self.frames); self.count = min(self.count + 1, len(self.frames))
+
+    def compute_metrics(self):
+        """Window metrics over frames where all key points are visible, or None if too few."""
+        window = np.roll(self.frames, -self.pos, axis=0)[-self.count:] # Oldest first
+        window = window[(window[:, :, 3] > VISIBILITY_THRESHOLD).all(axis=1)]
+        if len(window) < POSTURE_MIN_VALID_FRAMES: return None
+        nose = window[:, NOSE, :3]; l_sh = window[:, L_SHOULDER, :3]; r_sh = window[:, R_SHOULDER, :3]
+        l_ear = window[:, L_EAR, :3]; r_ear = window[:, R_EAR, :3]
+        shoulder_mid = (l_sh + r_sh) / 2.0
+        shoulder_width = np.maximum(np.hypot(*(l_sh[:, :2] - r_sh[:, :2]).T), 1e-3)
+        def line_angle(a, b): # Angle of the a-b line from horizontal, 0..90 degrees
+            d = np.abs(a[:, :2] - b[:, :2])
+            return np.degrees(np.arctan2(d[:, 1], d[:, 0]))
+        mean_width = float(shoulder_width.mean())
+        return {
+            'slouch_ratio': float(((shoulder_mid[:, 1] - nose[:, 1]) / shoulder_width).mean()),
+            'shoulder_angle': float(line_angle(l_sh, r_sh).mean()),
+            'head_tilt': float(line_angle(l_ear, r_ear).mean()),
+            'forward_lean': float(((shoulder_mid[:, 2] - nose[:, 2]) / shoulder_width).mean()),
+            'jitter': float(np.median(np.hypot(*np.diff(nose[:, :2], axis=0).T)) / mean_width), # One shift then stillness stays low
+            'frames': int(len(window)),
+        }
+
+    def update(self, points):
+        """Pushes one (5, 4) frame and returns the current posture label."""
+        self.push(points)
+        metrics = self.compute_metrics()
+        if metrics is None:
+            self.metrics = {}
+            return "Posture: Detecting..." if self.count < POSTURE_MIN_VALID_FRAMES else "Posture: Key points hidden"
+        self.metrics = {k: round(v, 3) if isinstance(v, float) else v for k, v in metrics.items()}
+        for label, metric, direction, enter, leave in POSTURE_RULES:
+            value = metrics[metric]
+            if direction == "below": self.active[label] = value < (leave if self.active[label] else enter)
+            else: self.active[label] = value > (leave if self.active[label] else enter)
+        return next((label for label, *_ in POSTURE_RULES if self.active[label]), "Posture: Looking Good")
+
+posture_engine = PostureEngine()
+current_posture_metrics = {}
+
+def reset_posture_window():
+    """Drops the landmark window and metrics (user left the frame, or a new session starts)."""
+    global current_posture_metrics
+    posture_engine.reset()
+    with posture_lock: current_posture_metrics = {}
+
+def analyze_posture(landmarks, frame_shape=None):
+    """Analyzes MediaPipe landmarks for posture cues over a sliding window of frames."""
+    global current_posture_metrics
+    if not landmarks: reset_posture_window(); return "Posture: No user detected"
     try:
-        lm = landmarks.landmark
-        required_indices = [ mp_pose.PoseLandmark.NOSE.value, mp_pose.PoseLandmark.LEFT_SHOULDER.value,
-            mp_pose.PoseLandmark.RIGHT_SHOULDER.value, mp_pose.PoseLandmark.LEFT_EAR.value, mp_pose.PoseLandmark.RIGHT_EAR.value ]
-        if any(idx >= len(lm) for idx in required_indices): return "Posture: Critical points missing"
-        nose = lm[mp_pose.PoseLandmark.NOSE.value]; l_shoulder = lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-        r_shoulder = lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]; l_ear = lm[mp_pose.PoseLandmark.LEFT_EAR.value]
-        r_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR.value]; visibility_threshold = 0.4
-        if not all(pt.visibility > visibility_threshold for pt in [nose, l_shoulder, r_shoulder, l_ear, r_ear]): return "Posture: Key points hidden"
-        shoulder_y_avg = (l_shoulder.y + r_shoulder.y) / 4.0; slouch_threshold = 0.06
-        if nose.y > shoulder_y_avg + slouch_threshold: return "Posture: Possible Slouching"
-        tilt_threshold = 0.02
-        if abs(l_ear.y - r_ear.y) > tilt_threshold: return "Posture: Head Tilt Detected"
-        return "Posture: Looking Good"
+        if max(POSTURE_LANDMARK_IDS) >= len(landmarks.landmark): return "Posture: Critical points missing"
+        aspect = frame_shape[0] / float(frame_shape[1]) if frame_shape else 1.0
+        label = posture_engine.update(landmarks_to_array(landmarks, aspect))
+        with posture_lock: current_posture_metrics = dict(posture_engine.metrics)
+        return label
     except IndexError: return "Posture: Landmark index out of range"
     except Exception as e: print(f"Posture analysis error: {e}"); return "Posture: Analysis Error"
 
@@ -246,38 +631,32 @@ def analyze_posture(landmarks):
 # (analyze_and_feedback function remains unchanged, it calls the now-modified speak)
 def analyze_and_feedback():
     """Analyzes practice data, saves to DB, gets Gemini feedback, updates AI msg & speaks locally."""
-    global current_posture_status, posture_lock, speech_practice_data, gemini_model, system_message_speech_review
+    global current_posture_status, posture_lock, speech_practice_data, gemini_review_model
     print("--- Analyzing Speech Practice ---")
-    full_text = speech_practice_data.get("text", ""); start_time = speech_practice_data.get("start_time"); end_time = time.time()
-    if start_time is None: print("   ❌ Error: Practice start time not recorded."); speak("Analysis aborted: start time missing."); return
-    duration_seconds = max(0, end_time - start_time); words = full_text.split(); total_words = len(words); wpm = 0
+    segments = speech_practice_data.get("segments"); start_time = speech_practice_data.get("start_time"); end_time = time.time()
+    if start_time is None or segments is None: print("   ❌ Error: Practice start time not recorded."); finish_session_recording(None); speak("Analysis aborted: start time missing."); return
+    full_text = segments.text(); duration_seconds = max(0, end_time - start_time); total_words = segments.total_words; wpm = 0
     if duration_seconds > 1: wpm = int(total_words / (duration_seconds / 60.0))
-    filler_count = 0
-    if full_text:
-        lower_text = full_text.lower()
-        for filler in FILLER_WORDS:
-            try: filler_count += len(re.findall(r'\b' + re.escape(filler) + r'\b', lower_text))
-            except re.error as re_err: print(f"   Warning: Regex error analyzing filler '{filler}': {re_err}")
+    filler_count = segments.total_fillers
     with posture_lock: final_posture = current_posture_status
     print(f"   📊 Duration: {duration_seconds:.2f}s, Words: {total_words}, WPM: {wpm}, Fillers: {filler_count}, Posture: {final_posture}")
     current_timestamp = datetime.now().isoformat()
-    try: save_practice_session(current_timestamp, round(duration_seconds, 2), total_words, wpm, filler_count, final_posture, full_text)
+    session_id = None
+    try: session_id = save_practice_session(current_timestamp, round(duration_seconds, 2), total_words, wpm, filler_count, final_posture, full_text, segments.to_dict())
     except Exception as db_e: print(f"   ❌ Error saving session to DB: {db_e}")
+    finish_session_recording(session_id)
     feedback_prefix = ( f"Alright, practice session over! Results saved. "
                         f"You spoke for about {duration_seconds:.1f}s ({total_words} words, ~{wpm} WPM) "
                         f"with {filler_count} fillers. Final posture: {final_posture}. " )
     gemini_feedback = ""
-    if not gemini_model: gemini_feedback = "My analysis brain isn't connected..."
+    if not gemini_review_model: gemini_feedback = "My analysis brain isn't connected..."
     elif not full_text and total_words == 0: gemini_feedback = "You didn't seem to say anything!"
     else:
-        prompt = ( f"{system_message_speech_review}\n\nUser's data:\nTranscript: \"{full_text}\"\nWPM: {wpm}\nFillers: {filler_count}\nPosture: {final_posture}\n\nProvide feedback." )
+        prompt = ( f"User's data:\nTranscript: \"{full_text}\"\nWPM: {wpm}\nFillers: {filler_count}\nPosture: {final_posture}\n\nProvide feedback." )
         print("\n   🧠 Requesting feedback from Gemini Speech Coach...")
         try:
-            response = gemini_model.generate_content(prompt)
-            if hasattr(response, 'parts') and response.parts: gemini_feedback = "".join(part.text for part in response.parts if hasattr(part, 'text'))
-            elif hasattr(response, 'text'): gemini_feedback = response.text
-            else: gemini_feedback = "My AI coach gave a response I couldn't understand."
-            gemini_feedback = gemini_feedback.strip(); print(f"   🤖 Gemini Feedback Received.")
+            response = gemini_review_model.generate_content(prompt)
+            gemini_feedback = extract_response_text(response) or "My AI coach gave a response I couldn't understand."; print(f"   🤖 Gemini Feedback Received.")
             if not gemini_feedback: gemini_feedback = "My AI coach seems to be speechless!"
         except Exception as e: print(f"   ❌ Error getting feedback from Gemini: {e}"); gemini_feedback = "Uh oh, had trouble getting detailed feedback."
     final_message_for_user = feedback_prefix + "\n" + gemini_feedback
@@ -323,6 +702,9 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
                     # Use the passed 'recognizer' instance
                     audio = recognizer.listen(source, phrase_time_limit=phrase_limit, timeout=listen_timeout)
                 except sr.WaitTimeoutError: continue # Normal, just loop
+            # listen() returns right after the phrase ends; back out its start from the audio length
+            phrase_end = time.time()
+            phrase_start = phrase_end - (len(audio.frame_data) / float(audio.sample_rate * audio.sample_width)) if audio else phrase_end
 
             if audio:
                  print("   👂 Processing audio...")
@@ -331,7 +713,7 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
                      recognized_text = recognizer.recognize_google(audio)
                      print(f"   👂 Heard: '{recognized_text}'")
                      recognized_text_lower = recognized_text.lower()
-                     add_message('user_voice', recognized_text) # Log heard input
+                     if not is_practicing_speech: add_message('user_voice', recognized_text) # Log heard input (practice speech lives in the segments)
 
                      # --- State-Based Logic ---
                      if is_practicing_speech: # --- PRACTICE MODE ---
@@ -340,15 +722,15 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
                              is_practicing_speech = False; speak("Okay, ending practice session now.") # Play TTS
                              try: analyze_and_feedback()
                              except Exception as analysis_err: print(f"❌ Error during analysis: {analysis_err}")
-                             finally: speech_practice_data = {"text": "", "start_time": None}
+                             finally: speech_practice_data = new_practice_data()
                          else: # Collect speech during practice
-                              speech_practice_data["text"] += (" " if speech_practice_data["text"] else "") + recognized_text
+                              speech_practice_data["segments"].append(recognized_text, phrase_start, phrase_end)
                               print(f"   📝 Text collected for practice.")
 
                      else: # --- NORMAL MODE (Commands or Chat) ---
                          if START_PRACTICE_PHRASE in recognized_text_lower:
                              print("   🚀 Starting practice via voice command...")
-                             is_practicing_speech = True; speech_practice_data = {"text": "", "start_time": time.time()}
+                             is_practicing_speech = True; speech_practice_data = new_practice_data(time.time()); reset_posture_window(); start_session_recording()
                              speak(f"Got it! Practice mode started. I'm listening.") # Play TTS
 
                          elif STOP_COMMAND in recognized_text_lower:
@@ -361,12 +743,8 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
                             if gemini_model:
                                 print("      🧠 Sending to Gemini...")
                                 try:
-                                    response = gemini_model.generate_content(recognized_text) # Send text to Gemini
-                                    ai_reply = "" # Extract reply
-                                    if hasattr(response, 'parts') and response.parts: ai_reply = "".join(part.text for part in response.parts if hasattr(part, 'text'))
-                                    elif hasattr(response, 'text'): ai_reply = response.text
-                                    else: ai_reply = "I got a response I couldn't understand."
-                                    ai_reply = ai_reply.strip()
+                                    response = gemini_model.generate_content(conversation.build_contents()) # Recent turns + summary
+                                    ai_reply = extract_response_text(response) or "I got a response I couldn't understand."
                                     if ai_reply:
                                         print(f"      🤖 Gemini Reply: '{ai_reply[:60]}...'")
                                         speak(ai_reply) # Play the reply LOCALLY using modified speak()
@@ -375,10 +753,10 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
                                         # speak("I didn't get a response for that.") # Optional feedback
                                 except Exception as e:
                                     print(f"      ❌ Gemini Error during chat: {e}")
-                                    speak("Oops, I had trouble thinking about that.") # Play TTS
+                                    speak("Oops, I had trouble thinking about that.", remember=False) # Play TTS
                             else:
                                 print("      ⚠️ Gemini model not available for chat.")
-                                speak("Sorry, my chat function isn't available right now.") # Play TTS
+                                speak("Sorry, my chat function isn't available right now.", remember=False) # Play TTS
                          # ------------------------------------
 
                  except sr.UnknownValueError: print("   👂 Could not understand audio.")
@@ -390,6 +768,99 @@ def recognize_speech(recognizer): # Accept recognizer instance 'r' as argument
     print("🔴 SR thread finished.")
 
 
+# --- Session Recording ---
+# Optional: while practicing, annotated frames are handed to a dedicated encoder thread
+# through a bounded queue. The camera loop never waits on disk; if the encoder falls
+# behind, frames are dropped and counted instead.
+RECORDINGS_DIR = "recordings"
+RECORDING_FPS = 15.0
+RECORDING_SEGMENT_SECONDS = 60
+RECORDING_QUEUE_SIZE = 30 # ~2s of frames at RECORDING_FPS
+RECORDING_CODECS = [("VP80", ".webm"), ("mp4v", ".mp4")] # First one the local OpenCV build can open wins
+recording_enabled = os.getenv("VOCALYTICS_RECORD", "0") == "1"
+session_recorder = None
+
+class SessionRecorder:
+    """Bounded-queue video recorder writing fixed-length segments from a background thread."""
+    def __init__(self, key, fps=RECORDING_FPS, segment_seconds=RECORDING_SEGMENT_SECONDS):
+        self.directory = os.path.join(RECORDINGS_DIR, key)
+        self.fps = fps; self.frames_per_segment = int(fps * segment_seconds)
+        self.queue = queue.Queue(maxsize=RECORDING_QUEUE_SIZE)
+        self.segments = [] # dicts: index, path, frames, dropped, fps
+        self.frames_submitted = 0; self.frames_dropped = 0; self.frames_written = 0
+        self._last_submit = 0.0
+        self._thread = threading.Thread(target=self._encode_loop, daemon=True)
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread.start()
+        print(f"🎥 Recording to '{self.directory}'.")
+        return self
+
+    def submit(self, frame):
+        """Called from the camera thread. Never blocks: throttles to fps and drops on a full queue."""
+        now = time.time()
+        if now - self._last_submit < 1.0 / self.fps: return
+        self._last_submit = now; self.frames_submitted += 1
+        try: self.queue.put_nowait(frame)
+        except queue.Full: self.frames_dropped += 1
+
+    def stop(self, timeout=10.0):
+        """Flushes queued frames, closes the last segment and returns the segment list."""
+        try: self.queue.put(None, timeout=timeout)
+        except queue.Full: print("   ⚠️ Recorder queue still full at stop; closing anyway.")
+        self._thread.join(timeout=timeout)
+        print(f"🎥 Recording stopped: {self.frames_written} frames written, {self.frames_dropped} dropped, {len(self.segments)} segment(s).")
+        return list(self.segments)
+
+    def _open_segment(self, frame):
+        height, width = frame.shape[:2]
+        for fourcc, ext in RECORDING_CODECS:
+            path = os.path.join(self.directory, f"segment_{len(self.segments):03d}{ext}")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), self.fps, (width, height))
+            if writer.isOpened():
+                self.segments.append({'index': len(self.segments), 'path': path, 'frames': 0, 'dropped': 0, 'fps': self.fps})
+                return writer
+            writer.release()
+        raise RuntimeError("no usable video codec")
+
+    def _encode_loop(self):
+        writer = None; dropped_at_open = 0
+        try:
+            while True:
+                frame = self.queue.get()
+                if frame is None: break
+                if writer is None or self.segments[-1]['frames'] >= self.frames_per_segment:
+                    if writer: writer.release(); self.segments[-1]['dropped'] = self.frames_dropped - dropped_at_open
+                    writer = self._open_segment(frame); dropped_at_open = self.frames_dropped
+                writer.write(frame)
+                self.segments[-1]['frames'] += 1; self.frames_written += 1
+        except Exception as e:
+            print(f"❌ Recording encoder error: {e}")
+        finally:
+            if writer:
+                writer.release(); self.segments[-1]['dropped'] = self.frames_dropped - dropped_at_open
+
+def start_session_recording(record=None):
+    """Starts a recorder for the practice session that is beginning. `record` overrides the env default for this session only."""
+    global session_recorder
+    if session_recorder: print("   ⚠️ Previous session's recorder still running."); finish_session_recording(None)
+    if not (recording_enabled if record is None else record): return
+    session_recorder = SessionRecorder(datetime.now().strftime("%Y%m%d_%H%M%S")).start()
+
+def finish_session_recording(session_id):
+    """Stops the active recorder and links its segments to the saved session (deletes them if there is none)."""
+    global session_recorder
+    recorder, session_recorder = session_recorder, None
+    if not recorder: return
+    segments = recorder.stop()
+    if session_id is not None:
+        if segments: save_session_recording(session_id, segments)
+        return
+    shutil.rmtree(recorder.directory, ignore_errors=True) # No session row would ever point at these files
+    print(f"🎥 Discarded {len(segments)} unlinked recording segment(s) in '{recorder.directory}'.")
+
+
 # --- Camera Processing & Streaming Functions ---
 # (run_camera_feed and gen_camera_frames remain unchanged from your provided code)
 def run_camera_feed():
@@ -418,13 +889,16 @@ def run_camera_feed():
             frame_rgb.flags.writeable = True; frame_bgr = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR)
             posture_text = "Posture: Detecting..."
             if results and results.pose_landmarks:
-                posture_text = analyze_posture(results.pose_landmarks)
+                posture_text = analyze_posture(results.pose_landmarks, frame.shape)
                 mp_drawing.draw_landmarks(frame_bgr, results.pose_landmarks, mp_pose.POSE_CONNECTIONS,
                     mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
                     mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2) )
+            elif posture_engine.count: reset_posture_window() # Stale window would skew the user's return
             with posture_lock: current_posture_status = posture_text
             cv2.putText(frame_bgr, posture_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
             if is_practicing_speech: cv2.putText(frame_bgr, "REC ●", (frame_bgr.shape[1] - 100, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2, cv2.LINE_AA)
+            recorder = session_recorder
+            if is_practicing_speech and recorder: recorder.submit(frame_bgr)
             encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 85]; ret_encode, buffer = cv2.imencode('.jpg', frame_bgr, encode_param)
             if not ret_encode:
                 current_time = time.time()
@@ -1,17 +1,29 @@
 # app.py - COMPLETE CODE (Corrected Thread Start)
-from flask import Flask, jsonify, request, render_template, send_from_directory, Response, redirect, url_for
+from flask import Flask, jsonify, request, render_template, send_from_directory, send_file, Response, redirect, url_for
 import sqlite3
 import os
 import json
-from datetime import datetime
+import hashlib
+import gzip
+import mimetypes
+from collections import OrderedDict
+import zlib
+import csv
+import io
+from datetime import datetime, date, timedelta
+import math
 import threading
 import Hackathon as hack # Import the MODIFIED Hackathon.py (assuming it expects 'recognizer' argument)
 import time
 import re
 import sys # For exit (optional)
+try:
+    import brotli # Optional: adds .br variants of static assets
+except ImportError:
+    brotli = None
 
 # --- Flask App Initialization ---
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None) # /static is served by send_static() below
 
 # --- Global State (within Flask app context) ---
 # Keep track of background threads started by Flask
@@ -35,11 +47,99 @@ def get_db_connection():
         if conn: conn.close()
         return None
 
+# --- Conditional GET / Response Cache ---
+# Read APIs are keyed on hack.data_versions: the ETag changes only when a write path
+# bumps a version, so a matching If-None-Match gets a 304 without touching SQLite.
+RESPONSE_CACHE_SIZE = 128
+response_cache = OrderedDict() # (path, args) -> (versions, etag, body, status)
+response_cache_lock = threading.Lock()
+BOOT_ID = f"{int(time.time()):x}" # Versions restart at 0, keep old ETags from matching after a restart
+
+def cached_json_response(data_tables, build, extra_key=()):
+    """
+    Serves build() -> (payload, status) with an ETag tied to the given data versions.
+    extra_key holds any other input the payload depends on (e.g. a default date range).
+    Only 200 responses are cached.
+    """
+    versions = hack.get_data_versions(*data_tables)
+    key = (request.path, tuple(sorted(request.args.items(multi=True))), tuple(extra_key))
+    etag = hashlib.sha1(repr((key, versions)).encode('utf-8')).hexdigest()[:16]
+    etag = f"{BOOT_ID}-{etag}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        with response_cache_lock:
+            entry = response_cache.get(key)
+            if entry and entry[0] == versions: response_cache.move_to_end(key)
+        if entry and entry[0] == versions:
+            body, status = entry[2], entry[3]
+        else:
+            payload, status = build()
+            body = json.dumps(payload)
+            if status == 200:
+                with response_cache_lock:
+                    response_cache[key] = (versions, etag, body, status); response_cache.move_to_end(key)
+                    while len(response_cache) > RESPONSE_CACHE_SIZE: response_cache.popitem(last=False)
+        response = Response(body, status=status, mimetype='application/json')
+    if response.status_code in (200, 304):
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache' # Always revalidate, the ETag makes that cheap
+    return response
+
 # --- Static Files Route ---
-@app.route('/static/<path:path>')
-def send_static(path):
-    static_folder = os.path.join(os.path.dirname(__file__), 'static')
-    return send_from_directory(static_folder, path)
+# Static files are fingerprinted and precompressed once at startup. Templates link to
+# the hashed name via asset_url(), which is served with a one-year immutable cache, so
+# repeat page loads don't fetch static bytes at all. Plain names still work (revalidated).
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+static_assets = {} # logical path -> asset dict
+fingerprinted_assets = {} # hashed path -> asset dict
+
+def build_static_assets(static_dir=STATIC_DIR):
+    """Hashes every static file and keeps its raw, gzip and (if available) brotli bytes in memory."""
+    static_assets.clear(); fingerprinted_assets.clear()
+    for root, _, files in os.walk(static_dir):
+        for file_name in files:
+            full_path = os.path.join(root, file_name)
+            logical = os.path.relpath(full_path, static_dir).replace(os.sep, '/')
+            with open(full_path, 'rb') as f: data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            stem, ext = os.path.splitext(logical)
+            mimetype = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+            asset = {'path': f"{stem}.{digest}{ext}", 'etag': digest, 'mimetype': mimetype, 'encodings': {'identity': data}}
+            if mimetype.startswith(COMPRESSIBLE_TYPES):
+                gz = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(gz) < len(data): asset['encodings']['gzip'] = gz
+                if brotli:
+                    br = brotli.compress(data, quality=11)
+                    if len(br) < len(data): asset['encodings']['br'] = br
+            static_assets[logical] = asset; fingerprinted_assets[asset['path']] = asset
+    print(f"   Built {len(static_assets)} static asset(s){' (brotli enabled)' if brotli else ''}.")
+
+@app.context_processor
+def inject_asset_url():
+    def asset_url(filename):
+        asset = static_assets.get(filename)
+        return url_for('static', filename=asset['path'] if asset else filename)
+    return {'asset_url': asset_url}
+
+@app.route('/static/<path:filename>', endpoint='static')
+def send_static(filename):
+    asset = fingerprinted_assets.get(filename)
+    if asset is None: return send_from_directory(STATIC_DIR, filename)
+    if asset['etag'] in request.if_none_match: response = Response(status=304)
+    else:
+        accepted = request.accept_encodings
+        encoding = next((enc for enc in ('br', 'gzip') if enc in asset['encodings'] and accepted[enc]), 'identity')
+        response = Response(asset['encodings'][encoding], mimetype=asset['mimetype'])
+        if encoding != 'identity': response.headers['Content-Encoding'] = encoding
+    response.set_etag(asset['etag'])
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+build_static_assets()
 
 # --- HTML Page Routes ---
 @app.route('/')
@@ -162,7 +262,10 @@ def start_practice_web():
     if not hack.is_practicing_speech:
         print("   Starting practice recording state...")
         hack.is_practicing_speech = True
-        hack.speech_practice_data = {"text": "", "start_time": time.time()}
+        hack.speech_practice_data = hack.new_practice_data(time.time())
+        hack.reset_posture_window()
+        options = request.get_json(silent=True) or {}
+        hack.start_session_recording(record=bool(options['record']) if 'record' in options else None)
         hack.speak("Okay, practice started! I'm listening.") # Use local TTS
         return jsonify({'success': True, 'message': 'Practice started.'}), 200
     else:
@@ -186,7 +289,7 @@ def end_practice_web():
              print(f"   Error during analysis feedback: {e}")
              hack.speak("There was an issue analyzing the session.") # Use local TTS
         finally:
-             hack.speech_practice_data = {"text": "", "start_time": None}
+             hack.speech_practice_data = hack.new_practice_data()
         return jsonify({'success': True, 'message': 'Practice ended. Analyzing...'}), 200
     else:
         print("   No practice session is currently active.")
@@ -226,13 +329,8 @@ def handle_chat():
     hack.add_message('user_web_chat', user_message)
     try:
         print("   Sending web message to Gemini...")
-        response = hack.gemini_model.generate_content(user_message)
-        ai_reply = "";
-        if hasattr(response, 'parts') and response.parts: ai_reply = "".join(part.text for part in response.parts if hasattr(part, 'text'))
-        elif hasattr(response, 'text'): ai_reply = response.text
-        elif isinstance(response, str): ai_reply = response
-        else: ai_reply = "Couldn't understand Gemini response format."
-        ai_reply = ai_reply.strip();
+        response = hack.gemini_model.generate_content(hack.conversation.build_contents()) # Recent turns + summary, within budget
+        ai_reply = hack.extract_response_text(response)
         if not ai_reply: ai_reply = "No comment."
         print(f"   AI reply generated (for web): '{ai_reply[:100]}...'")
         # Update state ONLY, no TTS from web chat API call
@@ -242,41 +340,40 @@ def handle_chat():
         return jsonify({'reply': ai_reply}), 200
     except Exception as e:
         print(f"   ❌ Gemini API Error during web chat: {e}")
-        hack.speak("Error processing web chat.") # Play local TTS error
+        hack.speak("Error processing web chat.", remember=False) # Play local TTS error, keep it out of the chat context
         return jsonify({'reply': "Internal error processing web chat."}), 500
 
 
 @app.route('/api/latest_practice_data')
 def get_latest_practice_data():
-    """Provides status data for the web UI."""
-    # (This function remains the same as the previous corrected version)
-    current_data = {}; is_live = hack.is_practicing_speech; error_msg = None
-    try:
-        if is_live:
-            start_time = hack.speech_practice_data.get("start_time", time.time()); duration = max(0, time.time() - start_time)
-            transcript = hack.speech_practice_data.get("text", ""); words = len(transcript.split()) if transcript else 0
-            wpm = int(words / (duration / 60.0)) if duration > 1 else 0; filler_count = 0
-            if transcript:
-                 lower_text = transcript.lower()
-                 for filler in hack.FILLER_WORDS:
-                     try: filler_count += len(re.findall(r'\b' + re.escape(filler) + r'\b', lower_text))
-                     except re.error as re_err: print(f"   Warning: Regex error in live stats for '{filler}': {re_err}")
-            with hack.posture_lock: posture = hack.current_posture_status
-            current_data = { 'session_id': 0, 'timestamp': datetime.now().isoformat(), 'duration_seconds': round(duration, 1),
-                'total_words': words, 'wpm': wpm, 'filler_count': filler_count, 'final_posture': posture, 'transcript': transcript }
-        else:
-            conn = get_db_connection()
-            if conn:
-                try:
-                    cur = conn.cursor(); cur.execute('SELECT * FROM speech_practice_sessions ORDER BY session_id DESC LIMIT 1'); row = cur.fetchone()
-                    if row: current_data = dict(row)
-                    else: current_data = { 'session_id': -1, 'timestamp': '', 'duration_seconds': 0, 'total_words': 0, 'wpm': 0, 'filler_count': 0, 'final_posture': 'N/A', 'transcript': 'No past sessions found.' }
-                except sqlite3.Error as db_e: print(f"   DB Error fetching last session: {db_e}"); error_msg = 'DB error fetching history.'; current_data = {'error': error_msg}
-                finally: conn.close()
-            else: error_msg = 'DB connection failed.'; current_data = {'error': error_msg}
-        response_data = { 'success': error_msg is None, 'is_live': is_live, 'practice_session': current_data, 'last_ai_message': hack.get_last_ai_message() }
+    """Provides status data for the web UI. The idle (last saved session) branch is served via the ETag cache."""
+    is_live = hack.is_practicing_speech
+    def build_idle():
+        current_data = {}; error_msg = None
+        conn = get_db_connection()
+        if conn:
+            try:
+                cur = conn.cursor(); cur.execute(f'SELECT {hack.SESSION_COLUMNS} FROM speech_practice_sessions ORDER BY session_id DESC LIMIT 1'); row = cur.fetchone()
+                if row: current_data = dict(row)
+                else: current_data = { 'session_id': -1, 'timestamp': '', 'duration_seconds': 0, 'total_words': 0, 'wpm': 0, 'filler_count': 0, 'final_posture': 'N/A', 'transcript': 'No past sessions found.' }
+            except sqlite3.Error as db_e: print(f"   DB Error fetching last session: {db_e}"); error_msg = 'DB error fetching history.'; current_data = {'error': error_msg}
+            finally: conn.close()
+        else: error_msg = 'DB connection failed.'; current_data = {'error': error_msg}
+        response_data = { 'success': error_msg is None, 'is_live': False, 'practice_session': current_data, 'last_ai_message': hack.get_last_ai_message() }
         if error_msg: response_data['error'] = error_msg
-        return jsonify(response_data), 200 if error_msg is None else 500
+        return response_data, 200 if error_msg is None else 500
+    try:
+        if not is_live: return cached_json_response(('sessions', 'ai_message'), build_idle)
+        segments = hack.speech_practice_data["segments"]; now = time.time(); duration = segments.elapsed(now)
+        words = segments.total_words; filler_count = segments.total_fillers
+        wpm = int(words / (duration / 60.0)) if duration > 1 else 0
+        with hack.posture_lock: posture = hack.current_posture_status; posture_metrics = hack.current_posture_metrics
+        current_data = { 'session_id': 0, 'timestamp': datetime.now().isoformat(), 'duration_seconds': round(duration, 1),
+            'total_words': words, 'wpm': wpm, 'filler_count': filler_count, 'final_posture': posture, 'posture_metrics': posture_metrics, 'transcript': segments.text(),
+            'rolling_wpm': segments.rolling_wpm(now), 'pauses': segments.pauses(), 'pace_series': segments.pace_series(now=now) }
+        recorder = hack.session_recorder
+        if recorder: current_data['recording'] = { 'frames_written': recorder.frames_written, 'frames_dropped': recorder.frames_dropped, 'segments': len(recorder.segments) }
+        return jsonify({ 'success': True, 'is_live': True, 'practice_session': current_data, 'last_ai_message': hack.get_last_ai_message() }), 200
     except Exception as e:
         print(f"   ❌ Unexpected Error in get_latest_practice_data: {e}")
         return jsonify({ 'success': False, 'error': f'Unexpected error: {str(e)}', 'is_live': is_live, 'practice_session': {}, 'last_ai_message': hack.get_last_ai_message() }), 500
@@ -284,51 +381,186 @@ def get_latest_practice_data():
 
 @app.route('/api/recent_stats')
 def get_recent_stats():
-    """Fetches aggregate stats and history."""
-    # (This function remains the same as the previous corrected version)
-    print("--- Accessed /api/recent_stats route ---"); conn = get_db_connection()
+    """Fetches aggregate stats and history (ETag-cached on the sessions version)."""
+    print("--- Accessed /api/recent_stats route ---")
+    def build():
+        conn = get_db_connection()
+        if not conn: return {'success': False, 'error': 'Database connection failed.'}, 500
+        stats = { 'totalSessions': 0, 'averageWpm': 0, 'totalPracticeTime': 0, 'improvementRate': 0, 'sessionHistory': [] }
+        try:
+            cursor = conn.cursor(); cursor.execute('SELECT COUNT(*) as count FROM speech_practice_sessions'); total_sessions_row = cursor.fetchone()
+            stats['totalSessions'] = total_sessions_row['count'] if total_sessions_row else 0
+            cursor.execute('SELECT AVG(wpm) as avg_wpm FROM speech_practice_sessions WHERE wpm > 0'); avg_wpm_row = cursor.fetchone()
+            stats['averageWpm'] = round(avg_wpm_row['avg_wpm']) if avg_wpm_row and avg_wpm_row['avg_wpm'] is not None else 0
+            cursor.execute('SELECT SUM(duration_seconds) as total_time FROM speech_practice_sessions'); total_time_row = cursor.fetchone()
+            stats['totalPracticeTime'] = round(total_time_row['total_time']) if total_time_row and total_time_row['total_time'] is not None else 0
+            limit = 7; cursor.execute(f'SELECT session_id, timestamp, wpm, filler_count, duration_seconds FROM speech_practice_sessions ORDER BY session_id DESC LIMIT ?', (limit,)); history_rows = cursor.fetchall()
+            session_history_list = [dict(row) for row in reversed(history_rows)]; stats['sessionHistory'] = session_history_list
+            if len(session_history_list) >= 2:
+                first_wpm = session_history_list[0].get('wpm', 0); last_wpm = session_history_list[-1].get('wpm', 0)
+                if first_wpm > 0: stats['improvementRate'] = round(((last_wpm - first_wpm) / first_wpm) * 100, 1)
+                else: stats['improvementRate'] = 0
+            return {'success': True, 'stats': stats}, 200
+        except sqlite3.Error as e: print(f"   DB Error in get_recent_stats: {e}"); return {'success': False, 'error': f'Database error: {e}', 'stats': stats}, 500
+        finally:
+            if conn: conn.close()
+    return cached_json_response(('sessions',), build)
+
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values: return 0
+    return sorted_values[max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)]
+
+def _trend_buckets(day_rows, bucket_start):
+    """
+    Folds per-day rows (day, sessions, fillers, seconds, comma-joined positive WPMs)
+    into buckets keyed by bucket_start(date) and summarizes each.
+    """
+    buckets = OrderedDict()
+    for day, sessions, fillers, seconds, wpm_list in day_rows:
+        key = bucket_start(date.fromisoformat(day)).isoformat()
+        bucket = buckets.setdefault(key, {'sessions': 0, 'wpms': [], 'fillers': 0, 'seconds': 0.0})
+        bucket['sessions'] += sessions; bucket['fillers'] += fillers; bucket['seconds'] += seconds
+        if wpm_list: bucket['wpms'].extend(map(int, wpm_list.split(',')))
+    result = []
+    for key, bucket in buckets.items():
+        wpms = sorted(bucket['wpms']); minutes = bucket['seconds'] / 60.0
+        result.append({ 'start': key, 'sessionCount': bucket['sessions'],
+            'meanWpm': round(sum(wpms) / len(wpms), 1) if wpms else 0, 'p90Wpm': _percentile(wpms, 90),
+            'fillersPerMinute': round(bucket['fillers'] / minutes, 2) if minutes > 0 else 0,
+            'practiceSeconds': round(bucket['seconds'], 1) })
+    return result
+
+TREND_BUCKETS = { # bucket arg -> (response key, date -> bucket start)
+    'day': ('daily', lambda d: d),
+    'week': ('weekly', lambda d: d - timedelta(days=d.weekday())), # Weeks start on Monday
+}
+TREND_DEFAULT_DAYS = 30
+
+@app.route('/api/trends')
+def get_trends():
+    """
+    Daily and weekly buckets of session count, mean/p90 WPM, fillers per minute and practice time.
+    Query args: start, end (YYYY-MM-DD, end inclusive; default last 30 days), bucket=day|week (default both).
+    Reads go through the (timestamp, wpm, filler_count, duration_seconds) covering index.
+    """
+    try:
+        end_day = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        start_day = date.fromisoformat(request.args['start']) if request.args.get('start') else end_day - timedelta(days=TREND_DEFAULT_DAYS - 1)
+    except ValueError: return jsonify({'success': False, 'message': 'start and end must be YYYY-MM-DD'}), 400
+    bucket_names = [request.args['bucket']] if request.args.get('bucket') else list(TREND_BUCKETS)
+    if any(name not in TREND_BUCKETS for name in bucket_names): return jsonify({'success': False, 'message': 'bucket must be day or week'}), 400
+    def build():
+        conn = get_db_connection()
+        if not conn: return {'success': False, 'error': 'Database connection failed.'}, 500
+        try:
+            # ISO timestamps sort as text, so a half-open string range is an index range scan.
+            # SQLite aggregates per day; only the WPM values come back for the p90.
+            day_rows = conn.execute("SELECT substr(timestamp, 1, 10) AS day, COUNT(*), SUM(filler_count), SUM(duration_seconds), "
+                                    "group_concat(CASE WHEN wpm > 0 THEN wpm END) FROM speech_practice_sessions "
+                                    "WHERE timestamp >= ? AND timestamp < ? GROUP BY day ORDER BY day",
+                                    (start_day.isoformat(), (end_day + timedelta(days=1)).isoformat())).fetchall()
+            trends = {TREND_BUCKETS[name][0]: _trend_buckets(day_rows, TREND_BUCKETS[name][1]) for name in bucket_names}
+            return {'success': True, 'start': start_day.isoformat(), 'end': end_day.isoformat(), 'trends': trends}, 200
+        except sqlite3.Error as e: print(f"   DB Error in get_trends: {e}"); return {'success': False, 'error': f'Database error: {e}'}, 500
+        finally: conn.close()
+    return cached_json_response(('sessions',), build, extra_key=(start_day.isoformat(), end_day.isoformat())) # Default range moves at midnight
+
+@app.route('/api/speech_history')
+def get_speech_history():
+    """Lists past practice sessions (newest first). Transcripts are fetched separately per session."""
+    search_term = request.args.get('search', ''); conn = get_db_connection()
+    if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
+    try:
+        cursor = conn.cursor()
+        if not search_term:
+            cursor.execute(f'SELECT {hack.SESSION_COLUMNS} FROM speech_practice_sessions ORDER BY session_id DESC')
+            return jsonify({'success': True, 'sessions': [dict(row) for row in cursor.fetchall()]}), 200
+        # Transcripts are compressed, so search decompresses them here (only the search path pays for it)
+        columns = ', '.join(f's.{c}' for c in hack.SESSION_COLUMNS.split(', '))
+        cursor.execute(f'SELECT {columns}, t.transcript FROM speech_practice_sessions s '
+                       'LEFT JOIN session_transcripts t ON t.session_id = s.session_id ORDER BY s.session_id DESC')
+        needle = search_term.casefold(); sessions = []
+        for row in cursor:
+            session = dict(row); transcript = hack.decompress_text(session.pop('transcript')) or ''
+            if any(needle in (value or '').casefold() for value in (session['timestamp'], session['final_posture'], transcript)): sessions.append(session)
+        return jsonify({'success': True, 'sessions': sessions}), 200
+    except (sqlite3.Error, zlib.error) as e: print(f"   DB Error getting speech history: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
+    finally:
+        if conn: conn.close()
+
+@app.route('/api/speech_history/<int:session_id>/transcript')
+def get_session_transcript(session_id):
+    """Loads and decompresses one session's transcript with its pace series and pauses."""
+    conn = get_db_connection()
     if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
-    stats = { 'totalSessions': 0, 'averageWpm': 0, 'totalPracticeTime': 0, 'improvementRate': 0, 'sessionHistory': [] }
     try:
-        cursor = conn.cursor(); cursor.execute('SELECT COUNT(*) as count FROM speech_practice_sessions'); total_sessions_row = cursor.fetchone()
-        stats['totalSessions'] = total_sessions_row['count'] if total_sessions_row else 0
-        cursor.execute('SELECT AVG(wpm) as avg_wpm FROM speech_practice_sessions WHERE wpm > 0'); avg_wpm_row = cursor.fetchone()
-        stats['averageWpm'] = round(avg_wpm_row['avg_wpm']) if avg_wpm_row and avg_wpm_row['avg_wpm'] is not None else 0
-        cursor.execute('SELECT SUM(duration_seconds) as total_time FROM speech_practice_sessions'); total_time_row = cursor.fetchone()
-        stats['totalPracticeTime'] = round(total_time_row['total_time']) if total_time_row and total_time_row['total_time'] is not None else 0
-        limit = 7; cursor.execute(f'SELECT session_id, timestamp, wpm, filler_count, duration_seconds FROM speech_practice_sessions ORDER BY session_id DESC LIMIT ?', (limit,)); history_rows = cursor.fetchall()
-        session_history_list = [dict(row) for row in reversed(history_rows)]; stats['sessionHistory'] = session_history_list
-        if len(session_history_list) >= 2:
-            first_wpm = session_history_list[0].get('wpm', 0); last_wpm = session_history_list[-1].get('wpm', 0)
-            if first_wpm > 0: stats['improvementRate'] = round(((last_wpm - first_wpm) / first_wpm) * 100, 1)
-            else: stats['improvementRate'] = 0
-        return jsonify({'success': True, 'stats': stats}), 200
-    except sqlite3.Error as e: print(f"   DB Error in get_recent_stats: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}', 'stats': stats}), 500
+        stored = hack.load_session_transcript(conn, session_id)
+        if stored is None: return jsonify({'success': False, 'message': 'Transcript not found'}), 404
+        segments = None
+        if stored['segments']:
+            try: segments = hack.TranscriptSegments.from_dict(stored['segments'])
+            except (TypeError, ValueError, AttributeError) as e: print(f"   Bad stored segments for session {session_id}, skipping pace data: {e}")
+        return jsonify({'success': True, 'session_id': session_id, 'transcript': stored['transcript'],
+                        'pace_series': segments.pace_series() if segments else [],
+                        'pauses': segments.pauses() if segments else []}), 200
+    except (sqlite3.Error, zlib.error, ValueError) as e: print(f"   Error loading transcript {session_id}: {e}"); return jsonify({'success': False, 'error': f'Transcript error: {e}'}), 500
     finally:
         if conn: conn.close()
 
 
-# --- Notecard API Routes ---
-# (These functions remain the same as the previous corrected version)
-@app.route('/api/notecards', methods=['GET'])
-def get_notecards():
-    search_term = request.args.get('search', ''); conn = get_db_connection()
+@app.route('/api/speech_history/<int:session_id>/recordings')
+def get_session_recordings(session_id):
+    """Lists the recorded video segments for one session with their frame/drop counters."""
+    conn = get_db_connection()
     if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
-    notecards = []
     try:
-        cursor = conn.cursor(); sql = 'SELECT id, title, content, tags, created_at FROM notecards '; params = []
-        if search_term: sql += 'WHERE title LIKE ? OR content LIKE ? OR tags LIKE ? '; like_term = f'%{search_term}%'; params.extend([like_term, like_term, like_term])
-        sql += 'ORDER BY created_at DESC'; cursor.execute(sql, params); rows = cursor.fetchall()
-        for row in rows:
-            notecard = dict(row)
-            try: tags_json = notecard.get('tags'); notecard['tags'] = json.loads(tags_json) if tags_json else []
-            except (json.JSONDecodeError, TypeError): notecard['tags'] = []
-            notecards.append(notecard)
-        return jsonify({'success': True, 'notecards': notecards}), 200
-    except sqlite3.Error as e: print(f"   DB Error getting notecards: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
+        cursor = conn.cursor(); cursor.execute('SELECT segment_index, frames, dropped_frames, fps FROM session_recordings WHERE session_id = ? ORDER BY segment_index', (session_id,))
+        segments = [dict(row) for row in cursor.fetchall()]
+        for segment in segments: segment['url'] = url_for('get_session_recording_segment', session_id=session_id, segment_index=segment['segment_index'])
+        return jsonify({'success': True, 'session_id': session_id, 'segments': segments}), 200
+    except sqlite3.Error as e: print(f"   DB Error getting recordings for {session_id}: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
     finally:
         if conn: conn.close()
 
+@app.route('/api/speech_history/<int:session_id>/recording/<int:segment_index>')
+def get_session_recording_segment(session_id, segment_index):
+    """Serves one recorded segment; send_file handles Range requests so the player can seek."""
+    conn = get_db_connection()
+    if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
+    try:
+        row = conn.execute('SELECT path FROM session_recordings WHERE session_id = ? AND segment_index = ?', (session_id, segment_index)).fetchone()
+    except sqlite3.Error as e: print(f"   DB Error getting recording {session_id}/{segment_index}: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
+    finally: conn.close()
+    if not row or not os.path.isfile(row['path']): return jsonify({'success': False, 'message': 'Recording not found'}), 404
+    return send_file(os.path.abspath(row['path']), conditional=True)
+
+
+# --- Notecard API Routes ---
+# (These functions remain the same as the previous corrected version)
+@app.route('/api/notecards', methods=['GET'])
+def get_notecards():
+    search_term = request.args.get('search', '')
+    def build():
+        conn = get_db_connection()
+        if not conn: return {'success': False, 'error': 'Database connection failed.'}, 500
+        notecards = []
+        try:
+            cursor = conn.cursor(); sql = 'SELECT id, title, content, tags, created_at FROM notecards '; params = []
+            if search_term: sql += 'WHERE title LIKE ? OR content LIKE ? OR tags LIKE ? '; like_term = f'%{search_term}%'; params.extend([like_term, like_term, like_term])
+            sql += 'ORDER BY created_at DESC'; cursor.execute(sql, params); rows = cursor.fetchall()
+            for row in rows:
+                notecard = dict(row)
+                try: tags_json = notecard.get('tags'); notecard['tags'] = json.loads(tags_json) if tags_json else []
+                except (json.JSONDecodeError, TypeError): notecard['tags'] = []
+                notecards.append(notecard)
+            return {'success': True, 'notecards': notecards}, 200
+        except sqlite3.Error as e: print(f"   DB Error getting notecards: {e}"); return {'success': False, 'error': f'Database error: {e}'}, 500
+        finally:
+            if conn: conn.close()
+    return cached_json_response(('notecards',), build)
+
 @app.route('/api/notecards', methods=['POST'])
 def create_notecard():
     data = request.json;
@@ -336,7 +568,7 @@ def create_notecard():
     conn = get_db_connection();
     if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
     try:
-        cursor = conn.cursor(); cursor.execute('INSERT INTO notecards (title, content, tags, created_at) VALUES (?, ?, ?, ?)', ( data.get('title'), data.get('content'), json.dumps(data.get('tags', [])), datetime.now().isoformat() )); notecard_id = cursor.lastrowid; conn.commit()
+        cursor = conn.cursor(); cursor.execute('INSERT INTO notecards (title, content, tags, created_at) VALUES (?, ?, ?, ?)', ( data.get('title'), data.get('content'), json.dumps(data.get('tags', [])), datetime.now().isoformat() )); notecard_id = cursor.lastrowid; conn.commit(); hack.bump_data_version('notecards')
         return jsonify({'success': True, 'id': notecard_id, 'message': 'Notecard created'}), 201
     except sqlite3.Error as e: print(f"   DB Error creating notecard: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
     finally:
@@ -351,7 +583,7 @@ def update_notecard(notecard_id):
     try:
         cursor = conn.cursor(); cursor.execute('UPDATE notecards SET title = ?, content = ?, tags = ? WHERE id = ?', ( data.get('title'), data.get('content'), json.dumps(data.get('tags', [])), notecard_id ))
         if cursor.rowcount == 0: return jsonify({'success': False, 'message': 'Notecard not found'}), 404
-        conn.commit(); return jsonify({'success': True, 'message': 'Notecard updated successfully'}), 200
+        conn.commit(); hack.bump_data_version('notecards'); return jsonify({'success': True, 'message': 'Notecard updated successfully'}), 200
     except sqlite3.Error as e: print(f"   DB Error updating notecard {notecard_id}: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
     finally:
         if conn: conn.close()
@@ -363,12 +595,169 @@ def delete_notecard(notecard_id):
     try:
         cursor = conn.cursor(); cursor.execute('DELETE FROM notecards WHERE id = ?', (notecard_id,))
         if cursor.rowcount == 0: return jsonify({'success': False, 'message': 'Notecard not found'}), 404
-        conn.commit(); return jsonify({'success': True, 'message': 'Notecard deleted successfully'}), 200
+        conn.commit(); hack.bump_data_version('notecards'); return jsonify({'success': True, 'message': 'Notecard deleted successfully'}), 200
     except sqlite3.Error as e: print(f"   DB Error deleting notecard {notecard_id}: {e}"); return jsonify({'success': False, 'error': f'Database error: {e}'}), 500
     finally:
         if conn: conn.close()
 
 
+# --- Bulk Export / Import Routes ---
+# Exports walk a live cursor and yield one row at a time, so memory stays flat no matter
+# how many rows there are. Imports parse the upload as a stream and insert in batches.
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+IMPORT_BATCH_SIZE = 1000
+SESSION_EXPORT_FIELDS = ['session_id', 'timestamp', 'duration_seconds', 'total_words', 'wpm', 'filler_count', 'final_posture', 'transcript', 'segments']
+NOTECARD_EXPORT_FIELDS = ['id', 'title', 'content', 'tags', 'created_at']
+
+def _export_format():
+    fmt = request.args.get('format', 'ndjson').lower()
+    return fmt if fmt in EXPORT_FORMATS else None
+
+def _stream_rows(conn, sql, fields, fmt, row_to_dict):
+    """Generator: runs `sql` on `conn` (closed when done) and yields NDJSON lines or CSV rows."""
+    try:
+        cursor = conn.execute(sql)
+        line = io.StringIO(); writer = csv.writer(line)
+        def csv_line(values):
+            line.seek(0); line.truncate(0); writer.writerow(values)
+            return line.getvalue()
+        if fmt == 'csv': yield csv_line(fields)
+        for row in cursor:
+            record = row_to_dict(row)
+            if fmt == 'csv': yield csv_line([record.get(f) for f in fields])
+            else: yield json.dumps(record, separators=(',', ':')) + '\n'
+    finally:
+        conn.close()
+
+def _export_response(rows, fmt, name):
+    response = Response(rows, mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
+
+def _session_export_dict(row, fmt):
+    record = {f: row[f] for f in SESSION_EXPORT_FIELDS[:7]}
+    record['transcript'] = hack.decompress_text(row['transcript'])
+    segments = hack.decompress_text(row['segments'])
+    record['segments'] = json.loads(segments) if segments and fmt == 'ndjson' else segments # CSV keeps the JSON string
+    return record
+
+@app.route('/api/export/sessions')
+def export_sessions():
+    """Streams every practice session (with transcript and segments JSON) as NDJSON or CSV."""
+    fmt = _export_format()
+    if not fmt: return jsonify({'success': False, 'message': 'format must be ndjson or csv'}), 400
+    columns = ', '.join(f's.{c}' for c in hack.SESSION_COLUMNS.split(', '))
+    sql = (f'SELECT {columns}, t.transcript, t.segments FROM speech_practice_sessions s '
+           'LEFT JOIN session_transcripts t ON t.session_id = s.session_id ORDER BY s.session_id')
+    conn = get_db_connection() # Opened up front so a failure is a JSON 500, not an empty download
+    if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
+    return _export_response(_stream_rows(conn, sql, SESSION_EXPORT_FIELDS, fmt, lambda row: _session_export_dict(row, fmt)), fmt, 'sessions')
+
+@app.route('/api/export/notecards')
+def export_notecards():
+    """Streams every notecard as NDJSON or CSV (tags kept as their JSON string in CSV)."""
+    fmt = _export_format()
+    if not fmt: return jsonify({'success': False, 'message': 'format must be ndjson or csv'}), 400
+    def notecard_dict(row):
+        record = dict(row)
+        if fmt == 'ndjson':
+            try: record['tags'] = json.loads(record['tags']) if record['tags'] else []
+            except (json.JSONDecodeError, TypeError): record['tags'] = []
+        return record
+    sql = 'SELECT id, title, content, tags, created_at FROM notecards ORDER BY id'
+    conn = get_db_connection()
+    if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
+    return _export_response(_stream_rows(conn, sql, NOTECARD_EXPORT_FIELDS, fmt, notecard_dict), fmt, 'notecards')
+
+def _iter_upload_records():
+    """Yields dicts from the request body, read as a stream (NDJSON by default, CSV if asked)."""
+    fmt = request.args.get('format') or ('csv' if 'csv' in (request.content_type or '') else 'ndjson')
+    text_stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='' if fmt == 'csv' else None)
+    if fmt == 'csv':
+        yield from csv.DictReader(text_stream)
+        return
+    for line in text_stream:
+        if line.strip(): yield json.loads(line)
+
+def _batched(records, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size: yield batch; batch = []
+    if batch: yield batch
+
+def _run_import(insert_batch, data_version):
+    """Runs insert_batch(cursor, batch) over the streamed upload inside one transaction."""
+    conn = get_db_connection()
+    if not conn: return jsonify({'success': False, 'error': 'Database connection failed.'}), 500
+    imported = 0
+    try:
+        cursor = conn.cursor(); cursor.execute('BEGIN IMMEDIATE')
+        for batch in _batched(_iter_upload_records()):
+            insert_batch(cursor, batch); imported += len(batch)
+        conn.commit(); hack.bump_data_version(data_version)
+        return jsonify({'success': True, 'imported': imported}), 200
+    except (ValueError, KeyError, TypeError, csv.Error) as e:
+        conn.rollback(); print(f"   Import rejected after {imported} rows: {e}")
+        return jsonify({'success': False, 'error': f'Invalid import data: {e}', 'imported': 0}), 400
+    except sqlite3.Error as e:
+        conn.rollback(); print(f"   DB Error during import: {e}")
+        return jsonify({'success': False, 'error': f'Database error: {e}', 'imported': 0}), 500
+    finally:
+        conn.close()
+
+def _import_timestamp(value):
+    """Normalized ISO timestamp; trends and listing order (sessions, notecards) depend on the ISO text form."""
+    if not isinstance(value, str): raise ValueError(f'timestamp must be an ISO string, got {value!r}')
+    try: return datetime.fromisoformat(value).isoformat()
+    except ValueError: raise ValueError(f'timestamp is not ISO 8601: {value!r}')
+
+def _import_segments(value):
+    """Segments JSON text from an object (NDJSON) or JSON string (CSV), or None if absent."""
+    if value is None or value == '': return None
+    if isinstance(value, str): value = json.loads(value)
+    if not isinstance(value, dict) or not all(isinstance(value.get(k), list) for k in ('texts', 'starts', 'ends')):
+        raise ValueError('segments must be an object with texts/starts/ends lists')
+    texts, starts, ends = value['texts'], value['starts'], value['ends']
+    if not len(texts) == len(starts) == len(ends): raise ValueError('segments texts/starts/ends must have the same length')
+    if not all(isinstance(t, str) for t in texts): raise ValueError('segments texts must be strings')
+    if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v) for v in starts + ends):
+        raise ValueError('segments starts/ends must be numbers')
+    return json.dumps(value, separators=(',', ':'))
+
+@app.route('/api/import/sessions', methods=['POST'])
+def import_sessions():
+    """Bulk-loads sessions from an export. Rows get fresh session ids so imports never collide."""
+    next_id = [None]
+    def insert_batch(cursor, batch):
+        if next_id[0] is None:
+            next_id[0] = (cursor.execute('SELECT COALESCE(MAX(session_id), 0) FROM speech_practice_sessions').fetchone()[0]) + 1
+        session_rows = []; transcript_rows = []
+        for record in batch:
+            session_id = next_id[0]; next_id[0] += 1
+            session_rows.append((session_id, _import_timestamp(record['timestamp']), float(record['duration_seconds']), int(record['total_words']),
+                                 int(record['wpm']), int(record['filler_count']), record.get('final_posture') or None))
+            transcript_rows.append((session_id, hack.compress_text(record.get('transcript') or ''), hack.compress_text(_import_segments(record.get('segments')))))
+        cursor.executemany(f'INSERT INTO speech_practice_sessions ({hack.SESSION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)', session_rows)
+        cursor.executemany('INSERT INTO session_transcripts (session_id, transcript, segments) VALUES (?, ?, ?)', transcript_rows)
+    return _run_import(insert_batch, 'sessions')
+
+@app.route('/api/import/notecards', methods=['POST'])
+def import_notecards():
+    """Bulk-loads notecards from an export (ids are reassigned)."""
+    def insert_batch(cursor, batch):
+        rows = []
+        for record in batch:
+            if not record.get('title') or not record.get('content'): raise ValueError('title and content are required')
+            tags = record.get('tags') or []
+            if isinstance(tags, str): tags = json.loads(tags) if tags.strip() else []
+            if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags): raise ValueError('tags must be a list of strings')
+            created_at = _import_timestamp(record['created_at']) if record.get('created_at') else datetime.now().isoformat()
+            rows.append((record['title'], record['content'], json.dumps(tags), created_at))
+        cursor.executemany('INSERT INTO notecards (title, content, tags, created_at) VALUES (?, ?, ?, ?)', rows)
+    return _run_import(insert_batch, 'notecards')
+
+
 # --- Main Execution ---
 if __name__ == '__main__':
     print("Initializing database via Hackathon module...")
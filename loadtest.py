@@ -0,0 +1,385 @@
+# loadtest.py - Load generator for the Flask app with fake camera/mic/Gemini/ElevenLabs backends
+#
+#   python loadtest.py serve                        # app.py on 127.0.0.1:5001 with fake backends + temp DB
+#   python loadtest.py run --spawn --pollers 20     # start the fake server itself, hammer it, write JSON
+#   python loadtest.py run --url http://127.0.0.1:5001 --server-pid 1234
+#
+# Results (per-route throughput, p50/p95/p99 latency, error rates, server CPU and RSS)
+# are printed and saved as JSON so runs can be compared across changes.
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+DEFAULT_PORT = 5001
+FAKE_PHRASES = [
+    "so today I want to talk about our quarterly results",
+    "um the main thing you know is that growth was steady",
+    "basically we shipped three features and like two of them landed well",
+    "well the next step is to focus on retention",
+    "thank you all for listening and I am happy to take questions",
+]
+
+
+# --- Fake Backends (server side) ---
+class FakeGeminiResponse:
+    def __init__(self, text):
+        self.text = text
+        self.parts = []
+
+class FakeGemini:
+    """Stands in for genai.GenerativeModel: sleeps like a network call, returns canned text."""
+    def __init__(self, delay):
+        self.delay = delay
+
+    def generate_content(self, prompt):
+        time.sleep(self.delay)
+        return FakeGeminiResponse(f"Nice work! (fake reply to {len(str(prompt))} chars of prompt)")
+
+class FakeElevenLabs:
+    """Stands in for the ElevenLabs client; playback time is simulated by fake_play()."""
+    def generate(self, text, **kwargs):
+        return iter([b"\0" * 16])
+
+def make_fake_play(delay):
+    def fake_play(audio_stream):
+        for _ in audio_stream: pass
+        time.sleep(delay)
+    return fake_play
+
+def synthetic_frames(count=30):
+    """Raw BGR frames with a moving block, standing in for what a webcam would deliver."""
+    import cv2
+    import numpy as np
+    frames = []
+    for i in range(count):
+        img = np.full((480, 640, 3), 40, dtype=np.uint8)
+        cv2.rectangle(img, (100 + i * 10, 150), (220 + i * 10, 330), (245, 117, 66), -1)
+        cv2.putText(img, "FAKE CAMERA", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2, cv2.LINE_AA)
+        frames.append(img)
+    return frames
+
+def make_fake_video_capture(fps):
+    """cv2.VideoCapture replacement: always opens and paces read() to `fps` like a real device."""
+    frames = synthetic_frames()
+    class FakeVideoCapture:
+        def __init__(self, index, *args):
+            self.index = index; self.count = 0; self.next_at = time.time()
+        def isOpened(self): return True
+        def read(self):
+            delay = self.next_at - time.time()
+            if delay > 0: time.sleep(delay)
+            self.next_at = max(self.next_at, time.time() - 1.0) + 1.0 / fps
+            frame = frames[self.count % len(frames)].copy(); self.count += 1
+            return True, frame
+        def release(self): pass
+    return FakeVideoCapture
+
+class FakePose:
+    """
+    Stands in for mp_pose.Pose: returns a seated figure with slight sway so posture analysis
+    and landmark drawing run every frame. With `real_pose`, MediaPipe inference still runs
+    on the frame for its CPU cost (its result is discarded, since synthetic frames have no person).
+    """
+    BASE_POINTS = {0: (0.50, 0.35), 7: (0.55, 0.33), 8: (0.45, 0.33), 11: (0.62, 0.52), 12: (0.38, 0.52)}
+
+    def __init__(self, real_pose=None):
+        from mediapipe.framework.formats import landmark_pb2
+        self.landmark_pb2 = landmark_pb2; self.real_pose = real_pose; self.frame = 0
+
+    def process(self, frame_rgb):
+        if self.real_pose: self.real_pose.process(frame_rgb)
+        self.frame += 1; sway = 0.01 * math.sin(self.frame / 15.0)
+        landmarks = self.landmark_pb2.NormalizedLandmarkList()
+        for i in range(33):
+            x, y = self.BASE_POINTS.get(i, (0.5, 0.7))
+            landmarks.landmark.add(x=x + sway + random.gauss(0, 0.002), y=y + random.gauss(0, 0.002), z=-0.2 if i in (0, 7, 8) else 0.0, visibility=0.99)
+        return types.SimpleNamespace(pose_landmarks=landmarks)
+
+    def close(self):
+        if self.real_pose: self.real_pose.close()
+
+def make_fake_mic(hack, phrase_interval):
+    """Replaces recognize_speech(): feeds canned phrases into the practice transcript while practicing."""
+    def fake_recognize_speech(recognizer=None):
+        print("🎤 Fake mic started.")
+        while not hack.main_thread_should_stop:
+            time.sleep(phrase_interval)
+            if hack.is_practicing_speech:
+                end = time.time()
+                hack.speech_practice_data["segments"].append(random.choice(FAKE_PHRASES), end - phrase_interval * 0.8, end)
+    return fake_recognize_speech
+
+def serve(args):
+    """Imports app.py with every external backend faked out and a throwaway DB, then serves it."""
+    # Placeholder keys keep Hackathon.py from building real clients at import time
+    os.environ["GOOGLE_API_KEY"] = "YOUR_GOOGLE_API_KEY_HERE"
+    os.environ["ELEVENLABS_API_KEY"] = "YOUR_ELEVENLABS_API_KEY_HERE"
+    if "api" not in sys.modules:
+        try: import api # noqa: F401
+        except ImportError:
+            sys.modules["api"] = types.SimpleNamespace(GOOGLE_API_KEY_FROM_USER="", ELEVENLABS_API_KEY_FROM_USER="")
+    import Hackathon as hack
+    import app as app_module
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix="vocalytics_load_"), "load.db")
+    hack.DB_FILE = db_path; app_module.DB_PATH = db_path
+    hack.init_database()
+
+    hack.gemini_model = FakeGemini(args.llm_delay); hack.gemini_review_model = FakeGemini(args.llm_delay); hack.gemini_summary_model = FakeGemini(args.llm_delay)
+    hack.elevenlabs_client = FakeElevenLabs(); hack.play = make_fake_play(args.tts_delay)
+    # Only the capture device and pose model are faked; run_camera_feed itself (posture analysis,
+    # annotation, JPEG encoding, recorder submission) runs as in production
+    hack.cv2.VideoCapture = make_fake_video_capture(args.camera_fps)
+    hack.pose = FakePose(hack.pose if args.real_pose else None)
+    hack.mic = hack.mic or object(); hack.mic_available = True
+    hack.recognize_speech = make_fake_mic(hack, args.phrase_interval)
+
+    print(f"--- Fake-backend server on http://{args.host}:{args.port} (DB: {db_path}) ---")
+    app_module.app.run(host=args.host, port=args.port, threaded=True, debug=False, use_reloader=False)
+
+
+# --- Server Resource Sampling ---
+class ProcessSampler(threading.Thread):
+    """Samples CPU % and RSS of a pid every `interval` seconds (psutil if installed, else /proc)."""
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid; self.interval = interval
+        self.samples = [] # (elapsed, cpu_percent, rss_bytes)
+        self.stop_event = threading.Event()
+        try:
+            import psutil
+            self.process = psutil.Process(pid)
+        except ImportError:
+            self.process = None
+
+    def _read(self):
+        if self.process:
+            with self.process.oneshot():
+                times = self.process.cpu_times(); return times.user + times.system, self.process.memory_info().rss
+        with open(f"/proc/{self.pid}/stat") as f: fields = f.read().rsplit(")", 1)[1].split()
+        ticks = os.sysconf("SC_CLK_TCK"); page = os.sysconf("SC_PAGE_SIZE")
+        return (int(fields[11]) + int(fields[12])) / ticks, int(fields[21]) * page
+
+    def run(self):
+        try: last_cpu, _ = self._read()
+        except (OSError, ValueError, IndexError) as e: print(f"⚠️ Can't sample server process {self.pid}: {e}"); return
+        start = last_time = time.time()
+        while not self.stop_event.wait(self.interval):
+            try: cpu, rss = self._read()
+            except (OSError, ValueError, IndexError): break
+            now = time.time()
+            self.samples.append((now - start, 100.0 * (cpu - last_cpu) / (now - last_time), rss))
+            last_cpu, last_time = cpu, now
+
+    def summary(self):
+        if not self.samples: return None
+        cpus = [s[1] for s in self.samples]; rss = [s[2] for s in self.samples]
+        return {'pid': self.pid, 'samples': len(self.samples), 'cpu_percent_mean': round(sum(cpus) / len(cpus), 1),
+                'cpu_percent_max': round(max(cpus), 1), 'rss_mb_start': round(rss[0] / 2**20, 1),
+                'rss_mb_max': round(max(rss) / 2**20, 1), 'rss_mb_end': round(rss[-1] / 2**20, 1)}
+
+
+# --- Load Generator (client side) ---
+class Stats:
+    """Thread-safe latency/status recorder keyed by route label."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list); self.statuses = defaultdict(lambda: defaultdict(int))
+        self.extra = defaultdict(lambda: defaultdict(float))
+
+    def record(self, route, started, status):
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[route].append(elapsed); self.statuses[route][status] += 1
+
+    def add(self, route, key, value):
+        with self.lock: self.extra[route][key] += value
+
+    def summary(self, wall_seconds):
+        routes = {}
+        with self.lock:
+            for route, values in self.latencies.items():
+                values = sorted(values); statuses = dict(self.statuses[route]); total = len(values)
+                errors = sum(n for s, n in statuses.items() if s == "error" or (isinstance(s, int) and s >= 500))
+                pct = lambda p: round(values[min(total - 1, int(p / 100.0 * total))] * 1000, 2)
+                routes[route] = {'requests': total, 'throughput_rps': round(total / wall_seconds, 2),
+                    'p50_ms': pct(50), 'p95_ms': pct(95), 'p99_ms': pct(99), 'max_ms': round(values[-1] * 1000, 2),
+                    'error_rate': round(errors / total, 4), 'statuses': {str(k): v for k, v in statuses.items()}}
+                routes[route].update({k: round(v, 2) for k, v in self.extra[route].items()})
+        return routes
+
+def timed_request(session, stats, route, method, url, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, timeout=30, **kwargs)
+        stats.record(route, started, response.status_code)
+        return response
+    except requests.RequestException:
+        stats.record(route, started, "error")
+        return None
+
+def poller(base, stats, stop, interval):
+    """One live_practice.html tab: polls latest_practice_data, revalidating with its ETag like a browser."""
+    session = requests.Session(); etag = None
+    while not stop.is_set():
+        headers = {'If-None-Match': etag} if etag else {}
+        response = timed_request(session, stats, "GET /api/latest_practice_data", "GET", f"{base}/api/latest_practice_data", headers=headers)
+        if response is not None and response.headers.get('ETag'): etag = response.headers['ETag']
+        stop.wait(interval)
+
+def stream_viewer(base, stats, stop):
+    """One <img src=/video_feed>: measures time to first frame, then counts frames until stopped."""
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter(); first = True; frames = 0; opened = time.time()
+        try:
+            with session.get(f"{base}/video_feed", stream=True, timeout=30) as response:
+                if response.status_code != 200: stats.record("GET /video_feed (first frame)", started, response.status_code); stop.wait(1); continue
+                for chunk in response.iter_content(chunk_size=16384):
+                    hits = chunk.count(b"--frame")
+                    if hits and first: stats.record("GET /video_feed (first frame)", started, 200); first = False
+                    frames += hits
+                    if stop.is_set(): break
+        except requests.RequestException:
+            stats.record("GET /video_feed (first frame)", started, "error")
+        stats.add("GET /video_feed (first frame)", "frames_received", frames)
+        stats.add("GET /video_feed (first frame)", "stream_seconds", time.time() - opened)
+
+def notecard_worker(base, stats, stop, think_time):
+    """CRUD + search mix roughly like someone using notes.html."""
+    session = requests.Session(); my_ids = []
+    words = ["intro", "budget", "timeline", "questions", "closing", "demo", "metrics"]
+    while not stop.is_set():
+        action = random.choices(["list", "search", "create", "update", "delete"], weights=[40, 25, 15, 10, 10])[0]
+        if action == "list":
+            timed_request(session, stats, "GET /api/notecards", "GET", f"{base}/api/notecards")
+        elif action == "search":
+            timed_request(session, stats, "GET /api/notecards?search", "GET", f"{base}/api/notecards", params={'search': random.choice(words)})
+        elif action == "create" or not my_ids:
+            body = {'title': f"{random.choice(words).title()} card", 'content': " ".join(random.choices(words, k=12)), 'tags': random.sample(words, 2)}
+            response = timed_request(session, stats, "POST /api/notecards", "POST", f"{base}/api/notecards", json=body)
+            if response is not None and response.status_code == 201: my_ids.append(response.json()['id'])
+        elif action == "update":
+            body = {'title': "Updated card", 'content': " ".join(random.choices(words, k=8)), 'tags': []}
+            timed_request(session, stats, "PUT /api/notecards/<id>", "PUT", f"{base}/api/notecards/{random.choice(my_ids)}", json=body)
+        else:
+            timed_request(session, stats, "DELETE /api/notecards/<id>", "DELETE", f"{base}/api/notecards/{my_ids.pop(random.randrange(len(my_ids)))}")
+        stop.wait(think_time)
+
+def practice_worker(base, stats, stop, practice_seconds):
+    """Start/end practice cycles; each end saves a session (and its fake Gemini/TTS feedback)."""
+    session = requests.Session()
+    while not stop.is_set():
+        timed_request(session, stats, "POST /start_practice_web", "POST", f"{base}/start_practice_web", json={})
+        stop.wait(practice_seconds)
+        timed_request(session, stats, "POST /end_practice_web", "POST", f"{base}/end_practice_web")
+        timed_request(session, stats, "GET /api/recent_stats", "GET", f"{base}/api/recent_stats")
+
+def wait_for_server(base, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base}/api/recent_stats", timeout=2).status_code < 500: return True
+        except requests.RequestException: pass
+        time.sleep(0.5)
+    return False
+
+def run(args):
+    server = None; pid = args.server_pid
+    base = args.url or f"http://127.0.0.1:{args.port}"
+    if args.spawn:
+        cmd = [sys.executable, os.path.abspath(__file__), "serve", "--port", str(args.port), "--llm-delay", str(args.llm_delay), "--tts-delay", str(args.tts_delay),
+               "--camera-fps", str(args.camera_fps), "--phrase-interval", str(args.phrase_interval)]
+        if args.real_pose: cmd.append("--real-pose")
+        server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL if args.quiet_server else None, stderr=subprocess.STDOUT if args.quiet_server else None)
+        pid = server.pid
+    try:
+        if not wait_for_server(base): print(f"❌ Server at {base} did not come up."); return 1
+        # Opening the page is what starts the camera/mic threads
+        requests.get(f"{base}/live-practice", timeout=30)
+        sampler = ProcessSampler(pid) if pid else None
+        if sampler: sampler.start()
+
+        stats = Stats(); stop = threading.Event(); threads = []
+        for _ in range(args.pollers): threads.append(threading.Thread(target=poller, args=(base, stats, stop, args.poll_interval)))
+        for _ in range(args.viewers): threads.append(threading.Thread(target=stream_viewer, args=(base, stats, stop)))
+        for _ in range(args.notecard_workers): threads.append(threading.Thread(target=notecard_worker, args=(base, stats, stop, args.think_time)))
+        for _ in range(args.practice_workers): threads.append(threading.Thread(target=practice_worker, args=(base, stats, stop, args.practice_seconds)))
+        print(f"--- Running {len(threads)} simulated clients against {base} for {args.duration}s ---")
+        started = time.time()
+        for t in threads: t.daemon = True; t.start()
+        time.sleep(args.duration); stop.set()
+        for t in threads: t.join(timeout=35)
+        wall = time.time() - started
+        if sampler: sampler.stop_event.set(); sampler.join(timeout=2)
+
+        result = {
+            'timestamp': datetime.now().isoformat(), 'url': base, 'duration_seconds': round(wall, 1),
+            'config': {k: getattr(args, k) for k in ('pollers', 'viewers', 'notecard_workers', 'practice_workers',
+                                                    'poll_interval', 'think_time', 'practice_seconds', 'llm_delay', 'tts_delay')},
+            'routes': stats.summary(wall), 'server': sampler.summary() if sampler else None,
+        }
+        print_report(result)
+        with open(args.out, "w") as f: json.dump(result, f, indent=2)
+        print(f"📄 Results saved to {args.out}")
+        return 0
+    finally:
+        if server: server.terminate(); server.wait(timeout=10)
+
+def print_report(result):
+    print(f"\n{'route':<34} {'reqs':>7} {'rps':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'err%':>6}")
+    for route, r in sorted(result['routes'].items()):
+        print(f"{route:<34} {r['requests']:>7} {r['throughput_rps']:>8} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['error_rate'] * 100:>6.1f}")
+    server = result['server']
+    if server: print(f"\nServer pid {server['pid']}: CPU mean {server['cpu_percent_mean']}% / max {server['cpu_percent_max']}%, RSS max {server['rss_mb_max']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Vocalytics Flask app.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_p = sub.add_parser("serve", help="Run app.py with fake camera/mic/Gemini/ElevenLabs and a temp DB.")
+    serve_p.add_argument("--host", default="127.0.0.1"); serve_p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_p.add_argument("--db", help="DB path (default: fresh temp file)")
+    serve_p.add_argument("--camera-fps", type=float, default=30.0); serve_p.add_argument("--phrase-interval", type=float, default=2.0)
+    serve_p.add_argument("--real-pose", action="store_true", help="Also run MediaPipe inference on every fake frame")
+    serve_p.add_argument("--llm-delay", type=float, default=0.5, help="Fake Gemini latency (s)")
+    serve_p.add_argument("--tts-delay", type=float, default=0.2, help="Fake TTS playback time (s)")
+
+    run_p = sub.add_parser("run", help="Generate load and report per-route latency.")
+    run_p.add_argument("--url", help=f"Server base URL (default http://127.0.0.1:{DEFAULT_PORT})")
+    run_p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    run_p.add_argument("--spawn", action="store_true", help="Start 'loadtest.py serve' as a subprocess and sample it")
+    run_p.add_argument("--server-pid", type=int, help="Sample CPU/RSS of an already running server")
+    run_p.add_argument("--quiet-server", action="store_true", help="Hide spawned server output")
+    run_p.add_argument("--duration", type=float, default=30.0)
+    run_p.add_argument("--pollers", type=int, default=10, help="live_practice.html tabs polling latest_practice_data")
+    run_p.add_argument("--viewers", type=int, default=2, help="/video_feed stream viewers")
+    run_p.add_argument("--notecard-workers", type=int, default=4)
+    run_p.add_argument("--practice-workers", type=int, default=1, help="Start/end practice cycles (only one session can be live)")
+    run_p.add_argument("--poll-interval", type=float, default=1.0)
+    run_p.add_argument("--think-time", type=float, default=0.2)
+    run_p.add_argument("--practice-seconds", type=float, default=5.0)
+    run_p.add_argument("--llm-delay", type=float, default=0.5); run_p.add_argument("--tts-delay", type=float, default=0.2)
+    run_p.add_argument("--camera-fps", type=float, default=30.0); run_p.add_argument("--phrase-interval", type=float, default=2.0)
+    run_p.add_argument("--real-pose", action="store_true", help="Spawned server also runs MediaPipe inference per frame")
+    run_p.add_argument("--out", default=f"loadtest_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+    if args.command == "run" and args.spawn and args.url: parser.error("--url can't be combined with --spawn (the spawned server listens on --port)")
+    if args.command == "serve": serve(args)
+    else: sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
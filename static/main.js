@@ -263,11 +263,24 @@ function showSessionDetails(session) {
             <span class="detail-label">Posture:</span>
             <span class="detail-value">${session.final_posture || 'Not recorded'}</span>
         </div>
+        <div class="detail-row">
+            <span class="detail-label">Pace by Minute:</span>
+            <span class="detail-value" id="detail-pace">Loading...</span>
+        </div>
+        <div class="detail-row">
+            <span class="detail-label">Long Pauses:</span>
+            <span class="detail-value" id="detail-pauses">Loading...</span>
+        </div>
         <h4>Transcript</h4>
-        <div class="transcript-box">
-            ${session.transcript || 'No transcript available.'}
+        <div class="transcript-box" id="detail-transcript">
+            ${session.transcript || 'Loading transcript...'}
         </div>
+        <div id="detail-recording"></div>
     `;
+
+    // Transcripts are stored separately from the session list, fetch on demand
+    loadSessionTranscript(session);
+    loadSessionRecording(session);
     
     // Update analytics charts
     updateAnalyticsCharts(session);
@@ -283,6 +296,58 @@ function showSessionDetails(session) {
     }
 }
 
+function loadSessionTranscript(session) {
+    const showTranscript = (data) => {
+        const transcriptBox = document.getElementById('detail-transcript');
+        const paceValue = document.getElementById('detail-pace');
+        const pausesValue = document.getElementById('detail-pauses');
+        if (transcriptBox) transcriptBox.textContent = data.transcript || 'No transcript available.';
+        if (paceValue) paceValue.textContent = data.pace_series && data.pace_series.length ? data.pace_series.join(' → ') + ' WPM' : 'Not recorded';
+        if (pausesValue) pausesValue.textContent = data.pauses ? data.pauses.length : 'Not recorded';
+    };
+
+    // Demo sessions carry their transcript inline
+    if (session.transcript) {
+        showTranscript(session);
+        return;
+    }
+
+    fetch(`/api/speech_history/${session.session_id}/transcript`)
+        .then(response => response.json())
+        .then(data => showTranscript(data && data.success ? data : {}))
+        .catch(error => {
+            console.error('Error fetching transcript:', error);
+            showTranscript({});
+        });
+}
+
+function loadSessionRecording(session) {
+    if (!session.session_id) return;
+
+    fetch(`/api/speech_history/${session.session_id}/recordings`)
+        .then(response => response.json())
+        .then(data => {
+            const recordingDiv = document.getElementById('detail-recording');
+            if (!recordingDiv || !data || !data.success || data.segments.length === 0) return;
+            recordingDiv.innerHTML = '<h4>Recording</h4>';
+            data.segments.forEach(segment => {
+                const video = document.createElement('video');
+                video.controls = true;
+                video.preload = 'metadata';
+                video.src = segment.url;
+                video.style.width = '100%';
+                recordingDiv.appendChild(video);
+                if (segment.dropped_frames > 0) {
+                    const note = document.createElement('p');
+                    note.className = 'instruction-text';
+                    note.textContent = `${segment.dropped_frames} frame(s) skipped while recording.`;
+                    recordingDiv.appendChild(note);
+                }
+            });
+        })
+        .catch(error => console.error('Error fetching recordings:', error));
+}
+
 function updateAnalyticsCharts(session) {
     // Get previous sessions for comparison (in a real app, fetch this from backend)
     const previousSessions = getDemoHistorySessions().filter(s => 
@@ -118,6 +118,12 @@ window.fetchAndUpdatePracticeData = async function() {
         const data = await response.json();
         console.log("Successfully fetched data:", data);
 
+        // Past sessions come without the transcript; it lives behind its own endpoint
+        if (!data.is_live && data.practice_session.transcript === undefined && data.practice_session.session_id > 0) {
+            const transcriptResponse = await fetch(`/api/speech_history/${data.practice_session.session_id}/transcript`);
+            if (transcriptResponse.ok) data.practice_session.transcript = (await transcriptResponse.json()).transcript;
+        }
+
         // Process data ONLY ONCE using mappedData
         const mappedData = {
             wpm: data.practice_session.wpm,